@@ -0,0 +1,92 @@
+"""Microbenchmark of the text paginator against the previous character-walking loop.
+
+Usage (from the repository root):
+    python -m benchmarks.pagination_bench [path/to/book.txt ...]
+
+Without paths a ~10 MB synthetic book is generated. Each run first checks
+that both implementations return identical page offsets.
+"""
+from typing import List, Tuple
+import random
+import sys
+import timeit
+
+from src.utils.Pagination_text import page_offsets, iter_page_offsets
+
+
+def legacy_page_offsets(text: str, chars_per_page: int = 8000) -> List[Tuple[int, int]]:
+    """The paginator as it was before the rfind-based engine, for reference."""
+    offsets = []
+    start = 0
+    text_length = len(text)
+
+    while start < text_length:
+        end = min(start + chars_per_page, text_length)
+        if end == text_length:
+            offsets.append((start, end))
+            break
+
+        last_break = end
+        while last_break > start and text[last_break] not in (' ', '\n'):
+            last_break -= 1
+
+        if last_break > start:
+            offsets.append((start, last_break))
+            start = last_break + 1
+        else:
+            offsets.append((start, end))
+            start = end
+
+    return offsets
+
+
+def legacy_split_text_into_pages(text: str, chars_per_page: int = 8000) -> Tuple[List[str], int]:
+    pages = [text[start:end] for start, end in legacy_page_offsets(text, chars_per_page)]
+    return pages, len(pages)
+
+
+def synthetic_book(size: int = 10 * 1024**2, seed: int = 0) -> str:
+    """Words of 1-14 letters with paragraph breaks and a few unbreakable runs."""
+    rng = random.Random(seed)
+    words = [''.join(rng.choices('abcdefghijklmnopqrstuvwxyz', k=rng.randint(1, 14))) for _ in range(5000)]
+    parts, length = [], 0
+    while length < size:
+        paragraph = ' '.join(rng.choices(words, k=rng.randint(20, 300)))
+        if rng.random() < 0.01:
+            paragraph += ' ' + 'x' * rng.randint(8000, 20000)  # Forces a hard cut
+        parts.append(paragraph)
+        length += len(paragraph) + 2
+    return '\n\n'.join(parts)
+
+
+def bench(name: str, text: str, chars_per_page: int = 8000, number: int = 5) -> None:
+    expected = legacy_page_offsets(text, chars_per_page)
+    assert page_offsets(text, chars_per_page) == expected, f'{name}: offsets differ'
+
+    cases = {
+        'legacy split_text_into_pages': lambda: legacy_split_text_into_pages(text, chars_per_page),
+        'legacy page_offsets': lambda: legacy_page_offsets(text, chars_per_page),
+        'page_offsets': lambda: page_offsets(text, chars_per_page),
+        'iter_page_offsets (count only)': lambda: sum(1 for _ in iter_page_offsets(text, chars_per_page)),
+        'page_offsets paragraphs=True': lambda: page_offsets(text, chars_per_page, paragraphs=True),
+    }
+    print(f'{name}: {len(text) / 1024**2:.1f} M chars, {len(expected)} pages of {chars_per_page}')
+    for label, case in cases.items():
+        best = min(timeit.repeat(case, number=number, repeat=3)) / number
+        print(f'  {label:<32} {best * 1000:9.2f} ms')
+
+
+def main(paths: list[str]) -> None:
+    if not paths:
+        text = synthetic_book()
+        bench('synthetic', text)
+        bench('synthetic', text, chars_per_page=2000)
+        return
+
+    for path in paths:
+        with open(path, encoding='utf-8', errors='replace', newline='') as file:
+            bench(path, file.read())
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -24,9 +24,10 @@
 
 # global_TODO Deploy [1, 1, 1, 1, 1] On docker
 
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, suppress
 from fastapi import FastAPI
 import logging 
+import asyncio
 import uvicorn
 
 from src.api.api_current.endpoints.routers import router as main_router
@@ -34,16 +35,30 @@ from src.api.api_current.endpoints.routers_core import router as core_router
 from src.api.api_current.auth.autentification import router as users_router
 from src.api.api_current.endpoints.foreign_api import router as foreign_router
 from src.core.middlewares.users import init_token_refresh_middleware
+from src.core.middlewares.body_size import init_body_size_middleware
 from src.core.services.database.db_helper import db_helper, settings
 from src.api.api_current.auth.config import securityAuthx
+from src.core.services.cache.books_cache import BookCacheService
+from src.utils.TextLoad import text_executor
+from src.api.api_current.orm.db_orm import media_sweeper
+from src.core.services.templating.templates import precompile_templates
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     print(settings)
+    precompile_templates()
+    invalidation_listener = asyncio.create_task(BookCacheService.listen_invalidations())
+    sweeper = asyncio.create_task(media_sweeper())
 
     yield
 
+    for task in (invalidation_listener, sweeper):
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    text_executor.shutdown(wait=False, cancel_futures=True)
+
     try:
         await db_helper.dispose()
         logger.debug("✅ Connection pool closed cleanly")
@@ -54,6 +69,7 @@ app = FastAPI(lifespan=lifespan)
 logger = logging.getLogger(__name__)
 
 init_token_refresh_middleware(app)
+init_body_size_middleware(app)
 securityAuthx.handle_errors(app)
 
 app.include_router(main_router)
@@ -1,10 +1,10 @@
-from fastapi.templating import Jinja2Templates
 from authx import AuthX, AuthXConfig
 from datetime import timedelta
 
-from src.core.config.config import (ACCESS_TYPE, REFRESH_TYPE, refresh_token_expire, access_token_expire, settings, frontend_root)
+from src.core.config.config import (ACCESS_TYPE, REFRESH_TYPE, refresh_token_expire, access_token_expire, settings)
+from src.core.services.templating.templates import templates
 
-templates_users = Jinja2Templates(directory=frontend_root)
+templates_users = templates
 config = AuthXConfig(
     JWT_ALGORITHM = settings.jwt_key.algorithm,
     JWT_SECRET_KEY=settings.jwt_key.key,
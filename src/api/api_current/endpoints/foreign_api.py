@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException
 from typing import Optional
 from fastapi import UploadFile, File, Form
+from starlette.datastructures import Headers
 from sqlalchemy.ext.asyncio import AsyncSession
 from aiohttp import ClientSession
 from datetime import datetime
@@ -10,7 +11,6 @@ import logging
 
 from src.utils.BookDownloader import BookLoader
 from src.api.api_current.endpoints.routers_core import postdata_book
-from src.utils.db_utils import text_process_direct
 from src.core.services.database.db_helper import db_helper
 from src.api.api_current.orm.db_orm import (select_data_book)
 
@@ -64,14 +64,15 @@ async def download_books(
                             results["failed"].append(book['title'])
                             continue
                             
-                        text_content = await response.text()
-                        processed_text = await text_process_direct(text_content)
+                        # Raw bytes: book_process decodes them with the declared charset and stores UTF-8
+                        raw_content = await response.read()
                         
-                        file_obj = io.BytesIO(processed_text.encode('utf-8'))
+                        file_obj = io.BytesIO(raw_content)
                         upload_file = UploadFile(
                             filename=f"{book['title']}",
                             file=file_obj,
-                            size=len(processed_text))
+                            size=len(raw_content),
+                            headers=Headers({'content-type': response.headers.get('Content-Type', 'text/plain')}))
                         await upload_file.seek(0)
                         
                         try:
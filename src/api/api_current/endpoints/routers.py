@@ -1,27 +1,31 @@
-from fastapi import APIRouter, Request, HTTPException, Response, Depends
-from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
+from fastapi import APIRouter, Request, HTTPException, Response, Depends, Query
+from fastapi.responses import HTMLResponse, RedirectResponse, FileResponse, JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime, timezone
 from typing import Annotated
 import logging
+import os
 
-from src.utils.db_utils import get_list, get_select
-from src.api.api_current.orm.db_orm import select_data_tag
-from src.core.config.config import frontend_root
+from src.api.api_current.orm.db_orm import select_data_book, select_reader_context, search_books, select_book_titles
+from src.core.services.templating.templates import templates
 from src.core.services.database.db_helper import db_helper
 from src.core.config.config import menu
 from src.core.menu.urls import choice_from_menu
 from src.core.services.cache.books_cache import BookCacheService
-from src.api.api_current.endpoints.services.paginator_helper import get_paginated_books
+from src.api.api_current.endpoints.services.paginator_helper import get_paginated_books, count_pages, encode_search_cursor, decode_search_cursor, encode_sort_cursor, decode_sort_cursor
+from src.core.services.cache.catalog_cache import CatalogCacheService
+from src.core.services.cache.tags_cache import TagCacheService
+from src.core.services.cache.autocomplete_cache import AutocompleteService
+from src.api.api_current.endpoints.services.http_cache import is_not_modified, not_modified, validator_headers, make_etag
+from src.core.services.search_engine.indexer import book_indexer
+from src.utils.TextLoad import TextLoad
 from src.api.api_current.auth.config import securityAuthx
-from src.utils.Pagination_text import split_text_into_pages
 from src.core.services.task_queue.emal_queue import send_email_task
 from src.utils.User_data import gather_user_data_from_cookies
 
 
 router = APIRouter()
 
-templates = Jinja2Templates(directory=frontend_root)
 logger = logging.getLogger(__name__)
 
 @router.get("/", response_class=HTMLResponse, tags=['root'])
@@ -48,29 +52,158 @@ async def get_books(
 ):
     
     try:
-        # Proper pagination query
-        data, paginated_books = await get_paginated_books(session, page)
-        
+        # The book list and paginator are the same for every user,
+        # they are rendered once per catalog version and page
+        version = await CatalogCacheService.get_version()
+        etag = make_etag('books', version, page)
+        if is_not_modified(request, etag):
+            return not_modified(etag)
+
+        fragment = await CatalogCacheService.get_fragment(version, page)
+        if fragment is None:
+            data, paginated_books = await get_paginated_books(session, page, version)
+            fragment = templates.get_template('includes/books_list.html').render(
+                books=paginated_books,
+                data=data
+            )
+            await CatalogCacheService.set_fragment(version, page, fragment)
+
         return templates.TemplateResponse(
         "get_books.html",
         {
         "request": request, 
         'description':'Choice the book!',
         'menu':menu,
-        "books":paginated_books,
-        "data":data,
+        "books_list":fragment,
         "menu_data":choice_from_menu,
-        }
+        },
+        headers=validator_headers(etag)
     )
     except Exception as e:
         logger.error(f"Error fetching books: {e}")
         raise HTTPException(status_code=500, detail="Error fetching books")
 
 @router.get('/tags', tags=['tags'])
-async def get_tags(session:Annotated[AsyncSession, Depends(db_helper.session_getter)]):
-    get_list_data = get_list(choice=1, session=session)
-    tags_data = (await get_list_data.get_obj())
-    return {'msg':'Data was gaved', 'data':tags_data}
+async def get_tags(
+    session:Annotated[AsyncSession, Depends(db_helper.session_getter)],
+    request:Request):
+    version, tags_data = await TagCacheService.get_catalog(session)
+    etag = f'"tags-{version}"'
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+
+    return JSONResponse({'msg':'Data was gaved', 'data':tags_data}, headers=validator_headers(etag))
+
+@router.get('/autocomplete', tags=['books'], dependencies=[Depends(securityAuthx.access_token_required)])
+async def autocomplete(
+    session:Annotated[AsyncSession, Depends(db_helper.session_getter)],
+    q:str=Query(min_length=1, max_length=128),
+    limit:int=Query(default=10, ge=1, le=50)):
+    """Titles and authors starting with q (at any word), most read first."""
+    if not await AutocompleteService.is_built():
+        await AutocompleteService.rebuild(session)
+    return {'msg':'Data was gaved', 'data':await AutocompleteService.suggest(q, limit)}
+
+@router.get('/search', tags=['books'], dependencies=[Depends(securityAuthx.access_token_required)])
+async def search(
+    session:Annotated[AsyncSession, Depends(db_helper.session_getter)],
+    q:str=Query(min_length=1, max_length=256),
+    cursor:str|None=None,
+    limit:int=Query(default=20, ge=1, le=100)):
+    """Books whose title, author or text match q; content hits point at a reader page."""
+    hits = await search_books(session, q, decode_search_cursor(cursor) if cursor else None, limit)
+    return {
+        'msg':'Data was gaved',
+        'data':[
+            {'id':i.id, 'title':i.title, 'author':i.author, 'page':i.page or None, 'rank':i.rank}
+            for i in hits
+            ],
+        'next_cursor':encode_search_cursor(hits[-1]) if len(hits) == limit else None
+        }
+
+@router.get('/search/engine', tags=['books'], dependencies=[Depends(securityAuthx.access_token_required)])
+async def search_engine_books(
+    session:Annotated[AsyncSession, Depends(db_helper.session_getter)],
+    q:str=Query(min_length=1, max_length=256),
+    cursor:str|None=None,
+    limit:int=Query(default=20, ge=1, le=100)):
+    """Elasticsearch matches of q with highlighted fragments; page hits point at a reader page."""
+    hits = await book_indexer.search(q, decode_sort_cursor(cursor) if cursor else None, limit)
+    titles = await select_book_titles(session, list({i['book_id'] for i in hits}))
+    return {
+        'msg':'Data was gaved',
+        'data':[
+            {
+                'id':i['book_id'],
+                'title':titles.get(i['book_id']),
+                'page':i['page'],
+                'score':i['score'],
+                'highlight':i['highlight']
+                }
+            for i in hits if i['book_id'] in titles
+            ],
+        'next_cursor':encode_sort_cursor(hits[-1]['sort']) if len(hits) == limit else None
+        }
+
+@router.get("/books/download/{book_id}", tags=['books'], dependencies=[Depends(securityAuthx.access_token_required)])
+async def download_book(
+    session: Annotated[AsyncSession, Depends(db_helper.session_getter)],
+    request: Request,
+    book_id: int
+):
+    """Serve the stored text file as is.
+
+    FileResponse answers Range requests and lets the server use sendfile,
+    so clients can resume large downloads without the text passing through Python.
+    """
+    book_data = await select_data_book(session, book_id)
+    if book_data is None or not book_data.text_hook:
+        raise HTTPException(status_code=404, detail="Book not found")
+
+    text_load = TextLoad(book_data)
+    try:
+        stat_result = os.stat(text_load.adress)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Book text not found")
+
+    etag = f'"{book_data.content_hash or f"{book_data.id}-{stat_result.st_mtime_ns}-{stat_result.st_size}"}"'
+    last_modified = datetime.fromtimestamp(stat_result.st_mtime, tz=timezone.utc)
+
+    if is_not_modified(request, etag, last_modified):
+        return not_modified(etag, last_modified)
+
+    return FileResponse(
+        text_load.adress,
+        stat_result=stat_result,
+        media_type='text/plain; charset=utf-8' if text_load.normalized else 'text/plain',
+        filename=f'{book_data.title}.txt',
+        content_disposition_type='inline',
+        headers=validator_headers(etag, last_modified)
+    )
+
+@router.get("/books/{page}/book/{book_title}/find", tags=['books'], dependencies=[Depends(securityAuthx.access_token_required)])
+async def find_in_book(
+    session: Annotated[AsyncSession, Depends(db_helper.session_getter)],
+    book_title: str,
+    page: int,
+    q: str = Query(min_length=1, max_length=256),
+    after: int = -1,
+    limit: int = Query(default=50, ge=1, le=500)
+):
+    """Every occurrence of q in the book, with a snippet and a link to its reader page."""
+    book_data = await select_data_book(session, book_title)
+    if book_data is None or not book_data.text_hook:
+        raise HTTPException(status_code=404, detail="Book not found")
+
+    matches, total = await BookCacheService.find_in_book(book_data, q, after, limit)
+    for match in matches:
+        match['url'] = f'/books/{page}/book/{book_title}/{match["page"]}'
+    return {
+        'msg':'Data was gaved',
+        'total':total,
+        'data':matches,
+        'next_cursor':matches[-1]['ordinal'] if total > len(matches) else None
+        }
 
 @router.get("/books/{page}/book/{book_title}", tags=['books'], dependencies=[Depends(securityAuthx.access_token_required)])
 @router.get("/books/{page}/book/{book_title}/{book_page}", tags=['books'], dependencies=[Depends(securityAuthx.access_token_required)])
@@ -81,16 +214,38 @@ async def get_book(
     page:int,
     book_page:int=1
 ):
-    # Get book data
-    get_select_data = get_select(select_id=book_title, session=session)
-    book_data = await get_select_data.get_obj()
+    # Book, its tags and the catalog total in one round trip
+    version = await CatalogCacheService.get_version()
+    total = await CatalogCacheService.get_total_books(version)
+    book_data, tags, counted = await select_reader_context(session, book_title, with_total=total is None)
+    if book_data is None:
+        raise HTTPException(status_code=404, detail="Book not found")
+
+    # The page only changes with the book, its tags or the catalog (total pages).
+    # No Last-Modified: updated_at moves with neither the tag links nor the catalog.
+    etag = make_etag(
+        'book', book_data.id, book_data.updated_at.isoformat(), book_data.content_hash,
+        ','.join(sorted(tags)), version, page, book_page
+    )
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+
+    # A view is opening the book, not turning its pages
+    if book_page == 1:
+        await AutocompleteService.record_view(book_data.id)
 
-    content = await BookCacheService.get_book_text(book_data)
-    pages_pet_text, count = split_text_into_pages(content)
+    if total is None:
+        total = counted
+        await CatalogCacheService.set_total_books(version, total)
 
-    # Get Page data
-    data, _ = await get_paginated_books(session)
-    data['current_page'] = page
+    content, count = await BookCacheService.get_book_page(book_data, book_page)
+    if content is None and count:
+        raise HTTPException(status_code=404, detail="Page not found")
+
+    data = {
+        'current_page':page,
+        'total_pages':count_pages(total)
+    }
     
     data_book = {
         'book_page':book_page,
@@ -101,9 +256,6 @@ async def get_book(
     # Log cache stats
     await BookCacheService.get_cache_stats()
 
-    # Get tags
-    res = await select_data_tag(session, book_data)
-
     user_data = await gather_user_data_from_cookies(request=request)
 
     try:
@@ -121,12 +273,13 @@ async def get_book(
         {
             "request": request,
             "description": "Good reading!",
-            "content": pages_pet_text[book_page-1],#content,
+            "content": content or '',
             "menu": menu,
-            "tags": [i.tag for i in res],
+            "tags": tags,
             "book": book_data,
             "menu_data": choice_from_menu,
             "data":data,
             "data_book":data_book
-        }
+        },
+        headers=validator_headers(etag)
     )
\ No newline at end of file
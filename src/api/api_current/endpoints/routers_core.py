@@ -1,28 +1,29 @@
-from fastapi import APIRouter, Depends, Request, HTTPException, status
+from fastapi import APIRouter, Depends, Request, HTTPException, Query, status
 from fastapi.responses import JSONResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
 from sqlalchemy.exc import IntegrityError, DBAPIError
 from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import UploadFile, File, Form
 from typing import Annotated
 from datetime import datetime
 import logging
+import os
 
-from src.utils.db_utils import get_list, book_process
-from src.api.api_current.orm.db_orm import ( drop_object, insert_data, update_data, select_data_tag, select_data_book)
-from src.core.pydantic_schemas.schemas import BookModelPydantic, TagsModelPydantic
+from src.utils.db_utils import book_process
+from src.api.api_current.orm.db_orm import ( drop_object, insert_data, insert_books_bulk, update_data, resolve_tag_ids, select_data_book, paginator, backfill_book_chunks)
+from src.core.pydantic_schemas.schemas import BookModelPydantic, StoredBookModelPydantic, TagsModelPydantic
 from src.utils.TextLoad import TextLoad
 from src.core.services.database.db_helper import db_helper
-from src.core.config.config import frontend_root
+from src.core.services.templating.templates import templates
 from src.api.api_current.auth.config import securityAuthx
 from src.core.config.config import menu
 from src.core.menu.urls import choice_from_menu
-from src.api.api_current.endpoints.services.paginator_helper import get_paginated_books
+from src.core.services.cache.tags_cache import TagCacheService
+from src.core.services.search_engine.indexer import book_indexer
+from src.api.api_current.endpoints.services.paginator_helper import get_paginated_books, encode_cursor, decode_cursor
 
 
 router = APIRouter(prefix='/action')
 logger = logging.getLogger(__name__)
-templates = Jinja2Templates(directory=frontend_root)
 
 @router.post('/insert/book', tags=['books'])
 async def insert_db_data_book(
@@ -31,6 +32,43 @@ async def insert_db_data_book(
     await insert_data(session, model)
     return {'msg':'Data was inserted'}
 
+@router.post('/insert/books/bulk', tags=['books'])
+async def insert_db_data_books_bulk(
+    session:Annotated[AsyncSession, Depends(db_helper.session_getter)],
+    models:list[BookModelPydantic]):
+    results = await insert_books_bulk(session, models)
+    inserted = sum(1 for i in results if i['status'] == 'inserted')
+    return {
+        'msg':'Data was inserted',
+        'inserted':inserted,
+        'rejected':len(results) - inserted,
+        'results':results
+        }
+
+@router.get('/list/books', tags=['books'])
+async def list_books(
+    session:Annotated[AsyncSession, Depends(db_helper.session_getter)],
+    cursor:str|None=None,
+    limit:int=Query(default=50, ge=1, le=500)):
+    books = await paginator(session, decode_cursor(cursor) if cursor else None, limit)
+    return {
+        'msg':'Data was gaved',
+        'data':[{'id':i.id, 'title':i.title, 'author':i.author} for i in books],
+        'next_cursor':encode_cursor(books[-1]) if len(books) == limit else None
+        }
+
+@router.post('/search/reindex', tags=['books'])
+async def reindex_search_engine(
+    session:Annotated[AsyncSession, Depends(db_helper.session_getter)]):
+    indexed = await book_indexer.reindex(session)
+    return {'msg':'Books were reindexed', 'indexed':indexed}
+
+@router.post('/search/chunks/reindex', tags=['books'])
+async def backfill_search_chunks(
+    session:Annotated[AsyncSession, Depends(db_helper.session_getter)]):
+    indexed = await backfill_book_chunks(session)
+    return {'msg':'Missing book pages were indexed', 'indexed':indexed}
+
 @router.post('/insert/tag', tags=['tags'])
 async def insert_db_data_tag(
     session:Annotated[AsyncSession, Depends(db_helper.session_getter)],
@@ -83,7 +121,8 @@ async def render_form_book(
     session:Annotated[AsyncSession, Depends(db_helper.session_getter)],
     request: Request
     ):
-    data = [i.tag for i in (await get_list(choice=1, session=session).get_obj())] # All tags select. Might cause some problems in future.
+    _, tags_data = await TagCacheService.get_catalog(session)
+    data = [i['tag'] for i in tags_data]
 
     return templates.TemplateResponse(
             "book_form_index.html",  # Template name
@@ -105,24 +144,32 @@ async def postdata_book(
     year: datetime = Form(default=datetime(1900, 1, 1)),
     session: AsyncSession = Depends(db_helper.session_getter)
 ):
-    local = await book_process(text_hook)
-    result = [i.id for i in await select_data_tag(session, tags)]
+    # Checked before storing the text, so a rejected upload leaves no file behind.
+    # A concurrent insert of the same title still fails below; its file is
+    # then collected by the media sweeper.
+    if await select_data_book(session=session, data=title):
+        raise HTTPException(status_code=400, detail='Book with such title already exists')
+
+    stored = await book_process(text_hook)
+    result = await resolve_tag_ids(session, tags)
 
     insert_input = {
         "title": title, 
         "author": author,
-        "text_hook": local,
+        "text_hook": stored.path,
+        "source_encoding": stored.source_encoding,
+        "byte_length": stored.byte_length,
+        "char_length": stored.char_length,
+        "content_hash": stored.content_hash,
+        "word_count": stored.word_count,
+        "page_count": stored.page_count,
         'year': year,
         "tags": result,
         "menu_data": choice_from_menu
     }
     
     try:
-        select_data = await select_data_book(session=session, data=title)
-        if select_data:
-            raise HTTPException(status_code=400, detail='Book with such title already exists')
-        
-        await insert_data(session, BookModelPydantic(**insert_input))
+        await insert_data(session, StoredBookModelPydantic(**insert_input))
         
     except IntegrityError:
         await session.rollback()
@@ -235,8 +282,10 @@ async def update_book(
             if not book:
                 raise HTTPException(404, "Book not found")
             
+            stored = {}
             if text_hook.filename:
-                text_path = await book_process(text_hook)
+                stored = (await book_process(text_hook))._asdict()
+                text_path = stored.pop('path')
             else:
                 text_path = book.text_hook
             
@@ -244,13 +293,14 @@ async def update_book(
                 "title":title,
                 "author":author,
                 "text_hook":text_path,
-                "tags":tags,
+                **stored,
+                "tags":await resolve_tag_ids(session, tags),
                 "year":year,
                 "menu_data":choice_from_menu,
                 "data":data
             }   
             
-            result = await update_data(session, book_id, BookModelPydantic(**insert))
+            result = await update_data(session, book_id, StoredBookModelPydantic(**insert))
             logger.debug(result.title)
             return RedirectResponse(f"/books/{page}/book/{title}", status_code=303)
             
@@ -267,8 +317,13 @@ async def delete_book_id(
     ):
 
     book = await select_data_book(session, book_id)
-    pull_len = TextLoad(book)
-    text_data = pull_len.push_text()
+    if book is None:
+        raise HTTPException(status_code=404, detail="Book not found")
+
+    lost = book.byte_length
+    if lost is None:
+        # Rows stored before ingest-time statistics: the file size is one stat away
+        lost = os.path.getsize(TextLoad(book).adress)
 
     data, _ = await get_paginated_books(session)
     data['current_page'] = page
@@ -279,7 +334,7 @@ async def delete_book_id(
         "request": request, 
         'menu':menu,
         'book':book,
-        'lost':len(text_data),
+        'lost':lost,
         "menu_data":choice_from_menu,
         "data":data
         }
@@ -0,0 +1,43 @@
+from fastapi import Request, Response
+from email.utils import format_datetime, parsedate_to_datetime
+from datetime import datetime, timezone
+import hashlib
+
+
+def make_etag(*parts) -> str:
+    """Strong ETag over everything a response is rendered from."""
+    return f'"{hashlib.sha1(":".join(map(str, parts)).encode()).hexdigest()}"'
+
+def validator_headers(etag:str, last_modified:datetime|None=None) -> dict[str, str]:
+    """ETag/Last-Modified headers for a response that must be revalidated on every use."""
+    headers = {
+        'etag': etag,
+        'cache-control': 'private, no-cache'
+    }
+    if last_modified is not None:
+        headers['last-modified'] = format_datetime(_as_utc(last_modified), usegmt=True)
+    return headers
+
+def is_not_modified(request:Request, etag:str, last_modified:datetime|None=None) -> bool:
+    """Whether the client's cached copy, per If-None-Match or If-Modified-Since, is still current."""
+    if_none_match = request.headers.get('if-none-match')
+    if if_none_match is not None:
+        tags = [tag.strip() for tag in if_none_match.split(',')]
+        return '*' in tags or etag in tags or f'W/{etag}' in tags
+
+    if_modified_since = request.headers.get('if-modified-since')
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        return _as_utc(last_modified).replace(microsecond=0) <= _as_utc(since)
+    return False
+
+def not_modified(etag:str, last_modified:datetime|None=None) -> Response:
+    return Response(status_code=304, headers=validator_headers(etag, last_modified))
+
+def _as_utc(value:datetime) -> datetime:
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
@@ -1,22 +1,93 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from fastapi import Depends
+from fastapi import Depends, HTTPException
+import base64
+import json
 
 from src.core.services.database.db_helper import db_helper
-from src.api.api_current.orm.db_orm import paginator, output_data
+from src.api.api_current.orm.db_orm import paginator, count_books, page_anchor
+from src.core.services.cache.catalog_cache import CatalogCacheService
 from src.core.config.config import per_page
 
+async def get_total_books(session: AsyncSession, version: int) -> int:
+    total = await CatalogCacheService.get_total_books(version)
+    if total is None:
+        total = await count_books(session)
+        await CatalogCacheService.set_total_books(version, total)
+    return total
+
+def encode_cursor(book) -> str:
+    """Opaque cursor pointing right after the given book in catalog order."""
+    return base64.urlsafe_b64encode(json.dumps([book.title, book.id]).encode()).decode()
+
+def decode_cursor(cursor: str) -> tuple[str, int]:
+    try:
+        title, book_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return str(title), int(book_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def encode_search_cursor(hit) -> str:
+    """Opaque cursor pointing right after the given search hit."""
+    return base64.urlsafe_b64encode(json.dumps([hit.rank, hit.id, hit.page]).encode()).decode()
+
+def decode_search_cursor(cursor: str) -> tuple[float, int, int]:
+    try:
+        rank, book_id, page = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return float(rank), int(book_id), int(page)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def encode_sort_cursor(values: list) -> str:
+    """Opaque cursor from a search engine hit's sort values."""
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+def decode_sort_cursor(cursor: str) -> list:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(values, list):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+async def get_page_anchor(session: AsyncSession, page: int, version: int) -> tuple[str, int] | None:
+    """Keyset anchor of a numbered catalog page, cached once found."""
+    if page <= 1:
+        return None
+
+    anchor = await CatalogCacheService.get_anchor(version, page)
+    if anchor is None:
+        anchor = await page_anchor(session, page)
+        if anchor is not None:
+            await CatalogCacheService.set_anchor(version, page, anchor)
+    return anchor
+
+def count_pages(total: int) -> int:
+    return -(-total // per_page)
+
 async def get_paginated_books(
     session: AsyncSession = Depends(db_helper.session_getter),
-    page: int=1
+    page: int=1,
+    version: int | None=None
 ):
-    paginated_books = await paginator(session, page)
-    all_books = await output_data(session)
-    lenght_data = len(all_books) / per_page
+    """One catalog page and the paginator data.
 
-    if str(lenght_data).split('.')[1] != '0':
-        lenght_data = int(lenght_data+1)
+    version is the catalog version read before any of the rows; everything
+    cached on the way is keyed by it.
+    """
+    if version is None:
+        version = await CatalogCacheService.get_version()
+    anchor = await get_page_anchor(session, page, version)
+    if page > 1 and anchor is None:
+        paginated_books = []  # Past the end of the catalog
+    else:
+        paginated_books = await paginator(session, anchor)
 
-    lenght_data = int(lenght_data)
+    if len(paginated_books) == per_page:
+        # Browsing forward never has to look its anchor up
+        last = paginated_books[-1]
+        await CatalogCacheService.set_anchor(version, page + 1, (last.title, last.id))
+    lenght_data = count_pages(await get_total_books(session, version))
 
     data = {
             'current_page':page,
@@ -1,14 +1,25 @@
-from sqlalchemy import select, update, delete, join
+from sqlalchemy import select, update, delete, insert, join, func, tuple_, cast, literal, union_all, or_, and_
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
-from sqlalchemy.orm import selectinload, joinedload
+from sqlalchemy.orm import selectinload, joinedload, aliased
 from fastapi import  HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.dialects.postgresql import insert as pg_insert, REGCONFIG
+import asyncio
 
 from src.core.config.config import logger
-from src.core.services.database.models.models import BookModelOrm, TagsModelOrm, TagsOnBookOrm, Base
-from src.core.pydantic_schemas.schemas import BookModelPydantic, TagsModelPydantic
-from src.core.config.config import per_page
+from src.core.services.database.models.models import BookModelOrm, TagsModelOrm, TagsOnBookOrm, BookChunkOrm, Base, search_config
+from src.core.pydantic_schemas.schemas import BookModelPydantic, TagsModelPydantic, STORED_TEXT_FIELDS
+from src.core.config.config import per_page, settings
 from src.core.services.database.db_helper import db_helper
+from src.core.services.cache.books_cache import BookCacheService
+from src.core.services.cache.catalog_cache import CatalogCacheService
+from src.core.services.cache.tags_cache import TagCacheService
+from src.core.services.cache.autocomplete_cache import AutocompleteService
+from src.core.services.storage.media_store import remove_file, stale_contents, remove_stale_temp_files
+from src.core.services.cache.redis_fastapi import redis
+from src.core.services.search_engine.indexer import book_indexer
+from src.utils.TextLoad import TextLoad, run_blocking
+from src.utils.Pagination_text import iter_page_offsets
 
 
 async def insert_data(
@@ -17,31 +28,140 @@ async def insert_data(
         ):
     logger.debug(data)
     try:
-        if type(data) == BookModelPydantic:
-            res = BookModelPydantic.model_validate(data, from_attributes=True)
+        if isinstance(data, BookModelPydantic):
+            res = type(data).model_validate(data, from_attributes=True)
             stm = select(TagsModelOrm).where(TagsModelOrm.id.in_(res.tags))
             tag_objs = await session.execute(stm)
-            session.add(BookModelOrm(
+            book = BookModelOrm(
                         title=res.title, 
                         author=res.author,
                         text_hook=res.text_hook,
+                        **{field: getattr(res, field, None) for field in STORED_TEXT_FIELDS},
                         tag_books=tag_objs.scalars().all()
-                        ))
+                        )
+            session.add(book)
             await session.commit()
+            await CatalogCacheService.invalidate()
+            await index_book_chunks(session, [(book.id, book)], replace=False)
+            await book_indexer.index_book(book.id, book)
+            await AutocompleteService.add_book(book.id, book.title, book.author)
 
         elif type(data) == TagsModelPydantic:
             res = TagsModelPydantic.model_validate(data, from_attributes=True)
             stm = select(BookModelOrm).where(BookModelOrm.id.in_(res.books))
             book_objs = (await session.execute(stm)).scalars().all()
-            session.add(TagsModelOrm(
+            tag = TagsModelOrm(
                     tag=res.tag,
                     book_tags=book_objs
-                    ))
+                    )
+            session.add(tag)
             await session.commit()
+            await TagCacheService.invalidate()
     except IntegrityError as err:
         raise err
 
 
+async def sync_tag_links(
+        session:AsyncSession,
+        owner,
+        owner_id:int,
+        wanted_ids:set[int]
+        ):
+    """Make the tagsinbooks links of one book (or tag) equal wanted_ids.
+
+    owner is TagsOnBookOrm.book_id or TagsOnBookOrm.tag_id. Only the current
+    link ids are read, and only added and removed pairs are written, each
+    in one bulk statement.
+    """
+    target = TagsOnBookOrm.tag_id if owner is TagsOnBookOrm.book_id else TagsOnBookOrm.book_id
+    current = await session.execute(select(target).where(owner == owner_id))
+    current_ids = set(current.scalars().all())
+
+    added = [{owner.key: owner_id, target.key: i} for i in wanted_ids - current_ids]
+    removed = [{owner.key: owner_id, target.key: i} for i in current_ids - wanted_ids]
+
+    if added:
+        await session.execute(
+            pg_insert(TagsOnBookOrm)
+            .values(added)
+            .on_conflict_do_nothing()
+        )
+    if removed:
+        await session.execute(
+            delete(TagsOnBookOrm)
+            .where(tuple_(TagsOnBookOrm.book_id, TagsOnBookOrm.tag_id).in_(
+                [(pair['book_id'], pair['tag_id']) for pair in removed]
+            ))
+        )
+
+
+def _batches(items:list, size:int):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+async def insert_books_bulk(
+        session:AsyncSession,
+        data:list[BookModelPydantic],
+        batch_size:int=1000
+        ) -> list[dict]:
+    """Insert many books with multi-row INSERT ... RETURNING and link their tags in bulk.
+
+    Titles that already exist, or repeat within the request, are reported
+    per row instead of failing the whole import. Everything is committed once.
+    """
+    results = [None] * len(data)
+    pending = {}
+    for index, book in enumerate(data):
+        if book.title in pending:
+            results[index] = {'index': index, 'title': book.title, 'status': 'duplicate'}
+        else:
+            pending[book.title] = index
+
+    requested_tags = {tag_id for book in data for tag_id in (book.tags or [])}
+    known_tags = set()
+    if requested_tags:
+        tag_ids = await session.execute(select(TagsModelOrm.id).where(TagsModelOrm.id.in_(requested_tags)))
+        known_tags = set(tag_ids.scalars().all())
+
+    # Every row needs the same keys; the stored-text columns are None unless ingest set them
+    columns = [*(set(BookModelPydantic.model_fields) - {'tags'}), *STORED_TEXT_FIELDS]
+    for batch in _batches(list(pending.values()), batch_size):
+        statement = (
+            pg_insert(BookModelOrm)
+            .values([{column: getattr(data[index], column, None) for column in columns} for index in batch])
+            .on_conflict_do_nothing(index_elements=[BookModelOrm.title])
+            .returning(BookModelOrm.title, BookModelOrm.id)
+        )
+        inserted = dict((await session.execute(statement)).all())
+
+        links = []
+        for index in batch:
+            book = data[index]
+            book_id = inserted.get(book.title)
+            if book_id is None:
+                results[index] = {'index': index, 'title': book.title, 'status': 'conflict'}
+                continue
+
+            tags = [tag_id for tag_id in dict.fromkeys(book.tags or []) if tag_id in known_tags]
+            links.extend({'book_id': book_id, 'tag_id': tag_id} for tag_id in tags)
+            results[index] = {'index': index, 'title': book.title, 'status': 'inserted', 'id': book_id}
+            missing = set(book.tags or []) - known_tags
+            if missing:
+                results[index]['missing_tags'] = sorted(missing)
+
+        for links_batch in _batches(links, batch_size * 10):
+            await session.execute(pg_insert(TagsOnBookOrm).values(links_batch).on_conflict_do_nothing())
+
+    await session.commit()
+    await CatalogCacheService.invalidate()
+    inserted_books = [(result['id'], data[index]) for index, result in enumerate(results) if result['status'] == 'inserted']
+    await index_book_chunks(session, inserted_books, replace=False)
+    await book_indexer.index_new_books(inserted_books)
+    await AutocompleteService.add_books([(book_id, book.title, book.author) for book_id, book in inserted_books])
+    return results
+
+
 async def update_data(
         session:AsyncSession,
         id_data: int, 
@@ -49,62 +169,75 @@ async def update_data(
         ):
     try:
         if isinstance(data, BookModelPydantic):
-                # 1. First get the book with relationships
+                # 1. First get the book, its tag links are diffed below
             book = await session.execute(
                     select(BookModelOrm)
                     .where(BookModelOrm.id == id_data)
-                    .options(selectinload(BookModelOrm.tag_books))
                 )
             book = book.scalar_one()
+            old_text_hook = book.text_hook
+            old_content_hash = book.content_hash
+            old_title = book.title
+            old_author = book.author
 
                 # 2. Update scalar fields
-            for field, value in data.model_dump(exclude={'tags'}).items():
+            fields = data.model_dump(exclude={'tags'}, exclude_unset=True)
+            if 'text_hook' in fields and fields['text_hook'] != old_text_hook:
+                # Statistics of the old text must not describe the new one
+                fields = {field: None for field in STORED_TEXT_FIELDS} | fields
+            for field, value in fields.items():
                 setattr(book, field, value)
 
                 # 3. Handle tags - verify existence first
             if data.tags:
-                tag_objs = await session.execute(
-                        select(TagsModelOrm)
+                tag_ids = await session.execute(
+                        select(TagsModelOrm.id)
                         .where(TagsModelOrm.id.in_(data.tags))
                     )
-                found_tags = tag_objs.scalars().all()
+                found_ids = set(tag_ids.scalars().all())
                     
                     # Validate all tags exist
-                if len(found_tags) != len(data.tags):
-                    found_ids = {t.id for t in found_tags}
+                if len(found_ids) != len(set(data.tags)):
                     missing = set(data.tags) - found_ids
                     raise ValueError(f"Tags not found: {missing}")
 
-                book.tag_books.clear()
-                book.tag_books.extend(found_tags)
+                await sync_tag_links(session, TagsOnBookOrm.book_id, book.id, found_ids)
 
             await session.commit()
+
+            if book.text_hook != old_text_hook:
+                await BookCacheService.invalidate_book(book.id)
+                await release_content(session, [old_content_hash])
+                await index_book_chunks(session, [(book.id, book)])
+            if book.title != old_title:
+                await CatalogCacheService.invalidate()
+            await book_indexer.index_book(book.id, book, with_pages=book.text_hook != old_text_hook)
+            if book.title != old_title or book.author != old_author:
+                await AutocompleteService.add_book(book.id, book.title, book.author)
             return book
 
         elif isinstance(data, TagsModelPydantic):
                 # Similar pattern for tags
-            tag = await session.execute(
+            tag = (await session.execute(
                     select(TagsModelOrm)
                     .where(TagsModelOrm.id == id_data)
-                    .options(selectinload(TagsModelOrm.book_tags))
-            ).scalar_one()
+            )).scalar_one()
 
             if data.books:
-                book_objs = await session.execute(
-                        select(BookModelOrm)
+                book_ids = await session.execute(
+                        select(BookModelOrm.id)
                         .where(BookModelOrm.id.in_(data.books))
                 )
-                found_books = book_objs.scalars().all()
+                found_ids = set(book_ids.scalars().all())
                     
-                if len(found_books) != len(data.books):
-                    found_ids = {b.id for b in found_books}
+                if len(found_ids) != len(set(data.books)):
                     missing = set(data.books) - found_ids
                     raise ValueError(f"Books not found: {missing}")
 
-                tag.book_tags.clear()
-                tag.book_tags.extend(found_books)
+                await sync_tag_links(session, TagsOnBookOrm.tag_id, tag.id, found_ids)
 
             await session.commit()
+            await TagCacheService.invalidate()
             return tag
             
     except ValueError as e:
@@ -122,13 +255,16 @@ async def drop_object(
         data:TagsModelPydantic|BookModelPydantic=None, 
         drop_id:int=None
         ):
+    released = []
     if drop_id is not None and data is not None:
         if data == BookModelPydantic:
             statement = (
                         delete(BookModelOrm)
                         .where(BookModelOrm.id == drop_id)
+                        .returning(BookModelOrm.content_hash)
                     )
-            await session.execute(statement)
+            released = (await session.execute(statement)).scalars().all()
+            await BookCacheService.invalidate_book(drop_id)
                 
         elif data == TagsModelPydantic:
             statement = (
@@ -140,17 +276,174 @@ async def drop_object(
     if drop_id is None and data is not None:
         statement = (
                         delete(BookModelOrm)
-
+                        .returning(BookModelOrm.content_hash)
         )
-        await session.execute(statement)
+        released = (await session.execute(statement)).scalars().all()
 
     await session.commit()
+    if data == TagsModelPydantic and drop_id is not None:
+        TagCacheService.forget([drop_id])
+        await TagCacheService.invalidate()
+    if data == BookModelPydantic or drop_id is None:
+        await CatalogCacheService.invalidate()
+        await book_indexer.remove_book(drop_id)
+        await AutocompleteService.remove_book(drop_id)
+    await release_content(session, released)
 
     #if drop_id is None and data is None:
     #    async with async_engine.begin() as conn:
     #        await conn.run_sync(Base.metadata.drop_all)
 
 
+async def index_book_chunks(
+        session:AsyncSession,
+        books:list[tuple[int, BookModelOrm|BookModelPydantic]],
+        replace:bool=True,
+        batch_size:int=200
+        ) -> int:
+    """Build the search vectors of books, one per reader page of their stored texts.
+
+    Pages of all the books go out in multi-row INSERTs of batch_size rows and
+    are committed once; replace drops the books' existing vectors first, which
+    new books can skip. Runs after the books were committed: a failure is
+    logged and leaves them without content search rather than failing the write.
+    Returns the number of pages indexed.
+    """
+    if not books or not (replace or any(book.text_hook for _, book in books)):
+        return 0
+
+    indexed = 0
+    rows = []
+    try:
+        if replace:
+            await session.execute(delete(BookChunkOrm).where(BookChunkOrm.book_id.in_([i for i, _ in books])))
+
+        for book_id, book in books:
+            if not book.text_hook:
+                continue
+            try:
+                text = await TextLoad(book).apush_text()
+            except OSError as err:
+                logger.error(f"Search indexing skipped book {book_id}: {err}")
+                continue
+
+            for number, (start, end) in enumerate(iter_page_offsets(text), start=1):
+                rows.append({
+                    'book_id': book_id,
+                    'page': number,
+                    'content_vector': func.to_tsvector(cast(search_config, REGCONFIG), text[start:end].replace('\x00', ''))
+                })
+                if len(rows) == batch_size:
+                    await session.execute(insert(BookChunkOrm).values(rows))
+                    indexed += len(rows)
+                    rows = []
+
+        if rows:
+            await session.execute(insert(BookChunkOrm).values(rows))
+            indexed += len(rows)
+        await session.commit()
+    except SQLAlchemyError as err:
+        await session.rollback()
+        logger.error(f"Search indexing failed for books {[i for i, _ in books]}: {err}")
+        return 0
+    return indexed
+
+
+async def backfill_book_chunks(session:AsyncSession, batch_size:int=50) -> int:
+    """Build the search vectors of every stored book that has none yet.
+
+    Picks up books stored before content search existed, or whose indexing
+    failed. Walks them by id, so an interrupted run simply starts over with
+    what is still missing. Returns the number of pages indexed.
+    """
+    has_chunks = select(BookChunkOrm.book_id).where(BookChunkOrm.book_id == BookModelOrm.id).exists()
+    indexed = 0
+    after = 0
+    while True:
+        result = await session.execute(
+            select(BookModelOrm)
+            .where(BookModelOrm.id > after, BookModelOrm.text_hook.isnot(None), ~has_chunks)
+            .order_by(BookModelOrm.id)
+            .limit(batch_size)
+        )
+        books = result.scalars().all()
+        if not books:
+            break
+        after = books[-1].id
+        indexed += await index_book_chunks(session, [(i.id, i) for i in books], replace=False)
+
+    logger.info(f'Search backfill indexed {indexed} pages')
+    return indexed
+
+
+async def release_content(
+        session:AsyncSession,
+        content_hashes:list[str|None]
+        ):
+    """Garbage-collect stored texts that no book references any more.
+
+    The books rows are the reference count: a file is removed once no row
+    carries its content hash. A text an upload claimed within the grace
+    period is left for sweep_media, as that upload's row may not be
+    committed yet.
+    """
+    content_hashes = {i for i in content_hashes if i}
+    if not content_hashes:
+        return
+
+    query = (
+        select(BookModelOrm.content_hash)
+        .where(BookModelOrm.content_hash.in_(content_hashes))
+        .distinct()
+    )
+    referenced = set((await session.execute(query)).scalars().all())
+
+    for content_hash in content_hashes - referenced:
+        if remove_file(content_hash):
+            await BookCacheService.invalidate_content(content_hash)
+
+
+async def sweep_media(session:AsyncSession, batch_size:int=1000) -> int:
+    """Remove stored texts that stayed unreferenced past the grace period.
+
+    Collects what release_content had to leave behind, and files of uploads
+    whose book row was never inserted. Returns the number of texts removed.
+    """
+    removed = 0
+    # The walk stats every stored file, so it stays off the event loop
+    stale = await run_blocking(lambda: list(stale_contents()))
+    for batch in _batches(stale, batch_size):
+        query = (
+            select(BookModelOrm.content_hash)
+            .where(BookModelOrm.content_hash.in_(batch))
+            .distinct()
+        )
+        referenced = set((await session.execute(query)).scalars().all())
+        for content_hash in set(batch) - referenced:
+            # remove_file checks the claim time again, right before deleting
+            if remove_file(content_hash):
+                await BookCacheService.invalidate_content(content_hash)
+                removed += 1
+
+    removed_temp = await run_blocking(remove_stale_temp_files)
+    logger.info(f'Media sweep removed {removed} texts and {removed_temp} abandoned uploads')
+    return removed
+
+
+async def media_sweeper() -> None:
+    """Run sweep_media every sweep_interval, in one worker at a time. Runs for the app lifetime."""
+    interval = settings.media_store.sweep_interval
+    while True:
+        await asyncio.sleep(interval.total_seconds())
+        try:
+            if not await redis.set('media:sweep', 1, nx=True, ex=interval):
+                continue
+            async with db_helper.session_factory() as session:
+                await sweep_media(session)
+        except Exception as err:
+            logger.error(f'Media sweep failed: {err}')
+
+
 async def output_data(
         session:AsyncSession,
         data:int=0
@@ -168,6 +461,11 @@ async def output_data(
         result = res.scalars().all()
         return result
 
+async def count_books(session:AsyncSession) -> int:
+    query = select(func.count()).select_from(BookModelOrm)
+    res = await session.execute(query)
+    return res.scalar_one()
+
 async def select_data_book(
         session:AsyncSession,
         data:str|int
@@ -183,22 +481,91 @@ async def select_data_book(
     result = res.scalar_one_or_none()
     return result
     
+async def select_book_titles(
+        session:AsyncSession,
+        ids:list[int]
+        ) -> dict[int, str]:
+    query = select(BookModelOrm.id, BookModelOrm.title).where(BookModelOrm.id.in_(ids))
+    res = await session.execute(query)
+    return dict(res.all())
+
+async def select_reader_context(
+        session:AsyncSession,
+        title:str,
+        with_total:bool=True
+        ) -> tuple[BookModelOrm|None, list[str], int|None]:
+    """Book by title, its tag names and (optionally) the catalog total in one statement."""
+    tag_names = (
+        select(func.array_agg(TagsModelOrm.tag))
+        .join(TagsOnBookOrm, TagsOnBookOrm.tag_id == TagsModelOrm.id)
+        .where(TagsOnBookOrm.book_id == BookModelOrm.id)
+        .scalar_subquery()
+    )
+    columns = [BookModelOrm, tag_names]
+    if with_total:
+        all_books = aliased(BookModelOrm)
+        columns.append(select(func.count()).select_from(all_books).scalar_subquery())
+
+    query = select(*columns).where(BookModelOrm.title == title)
+    row = (await session.execute(query)).first()
+    if row is None:
+        return None, [], None
+    return row[0], row[1] or [], (row[2] if with_total else None)
+
+async def resolve_tag_ids(
+        session:AsyncSession,
+        names:list[str],
+        create_missing:bool=False
+        ) -> list[int]:
+    """Ids of the named tags, in order, skipping unknown names unless create_missing.
+
+    Names already seen by this worker at the current tags:version are answered
+    from TagCacheService; the rest cost one IN query, plus one upsert when
+    missing tags are created.
+    """
+    names = list(dict.fromkeys(name for name in names if name))
+    version, known = await TagCacheService.lookup(names)
+    missing = [name for name in names if name not in known]
+
+    if missing:
+        result = await session.execute(
+                select(TagsModelOrm.tag, TagsModelOrm.id)
+                .where(TagsModelOrm.tag.in_(missing))
+        )
+        found = dict(result.all())
+        absent = [name for name in missing if name not in found]
+
+        if create_missing and absent:
+            statement = pg_insert(TagsModelOrm).values([{'tag': name} for name in absent])
+            statement = (
+                statement
+                # No-op update so rows created concurrently are returned too
+                .on_conflict_do_update(index_elements=[TagsModelOrm.tag], set_={'tag': statement.excluded.tag})
+                .returning(TagsModelOrm.tag, TagsModelOrm.id)
+            )
+            found.update(dict((await session.execute(statement)).all()))
+            await session.commit()
+            await TagCacheService.invalidate()
+
+        TagCacheService.remember(found, version)
+        known.update(found)
+
+    return [known[name] for name in names if name in known]
+
 async def select_data_tag(
         session:AsyncSession,
         data: list | BookModelOrm
         ):
     if isinstance(data, list):
-        # Handle list of tag names
-        tag_list = []
-        for tag_name in data:
-            result = await session.execute(
-                    select(TagsModelOrm)
-                    .where(TagsModelOrm.tag == tag_name)
-            )
-            tag = result.scalar_one_or_none()
-            if tag:
-                tag_list.append(tag)
-        return tag_list
+        # Handle list of tag names, in one query
+        if not data:
+            return []
+        result = await session.execute(
+                select(TagsModelOrm)
+                .where(TagsModelOrm.tag.in_(data))
+        )
+        tags = {tag.tag: tag for tag in result.scalars().all()}
+        return [tags[tag_name] for tag_name in dict.fromkeys(data) if tag_name in tags]
             
     elif isinstance(data, BookModelOrm):
         # Handle BookModelOrm with eager loading
@@ -213,8 +580,81 @@ async def select_data_tag(
         return book.tag_books if book else []
     return []
 
-async def paginator(session:AsyncSession, page:int):
-    stmt = select(BookModelOrm).limit(per_page).offset((page-1)*per_page)
+async def paginator(
+        session:AsyncSession,
+        after:tuple[str, int]|None=None,
+        limit:int=per_page
+        ):
+    """Books ordered by (title, id), starting right after the given key.
+
+    Keyset pagination: every page costs one index range scan, however deep it is.
+    """
+    stmt = (
+        select(BookModelOrm)
+        .order_by(BookModelOrm.title, BookModelOrm.id)
+        .limit(limit)
+    )
+    if after is not None:
+        stmt = stmt.where(tuple_(BookModelOrm.title, BookModelOrm.id) > tuple_(*after))
+
     result = await session.execute(stmt)
     books = result.scalars().all()
-    return books
\ No newline at end of file
+    return books
+
+async def page_anchor(session:AsyncSession, page:int) -> tuple[str, int]|None:
+    """Key of the last book before a catalog page, found by skipping over the index once."""
+    stmt = (
+        select(BookModelOrm.title, BookModelOrm.id)
+        .order_by(BookModelOrm.title, BookModelOrm.id)
+        .offset((page-1)*per_page - 1)
+        .limit(1)
+    )
+    result = (await session.execute(stmt)).first()
+    return tuple(result) if result else None
+
+async def search_books(
+        session:AsyncSession,
+        query:str,
+        after:tuple[float, int, int]|None=None,
+        limit:int=per_page
+        ):
+    """Title/author and content matches of a web-style query, best ts_rank first.
+
+    Title and author hits have page 0, content hits carry the reader page they
+    were found on. Both sides are answered from GIN indexes, no file is read.
+    Keyset pagination on (rank desc, book id, page).
+    """
+    tsquery = func.websearch_to_tsquery(cast(search_config, REGCONFIG), query)
+    by_book = (
+        select(
+            BookModelOrm.id.label('book_id'),
+            literal(0).label('page'),
+            func.ts_rank(BookModelOrm.search_vector, tsquery).label('rank')
+        )
+        .where(BookModelOrm.search_vector.op('@@')(tsquery))
+    )
+    by_content = (
+        select(
+            BookChunkOrm.book_id,
+            BookChunkOrm.page,
+            func.ts_rank(BookChunkOrm.content_vector, tsquery).label('rank')
+        )
+        .where(BookChunkOrm.content_vector.op('@@')(tsquery))
+    )
+    hits = union_all(by_book, by_content).subquery()
+
+    stmt = (
+        select(hits.c.rank, hits.c.page, BookModelOrm.id, BookModelOrm.title, BookModelOrm.author)
+        .join(BookModelOrm, BookModelOrm.id == hits.c.book_id)
+        .order_by(hits.c.rank.desc(), hits.c.book_id, hits.c.page)
+        .limit(limit)
+    )
+    if after is not None:
+        rank, book_id, page = after
+        stmt = stmt.where(or_(
+            hits.c.rank < rank,
+            and_(hits.c.rank == rank, tuple_(hits.c.book_id, hits.c.page) > tuple_(book_id, page))
+        ))
+
+    result = await session.execute(stmt)
+    return result.all()
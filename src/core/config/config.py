@@ -1,5 +1,4 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from datetime import datetime
 from pathlib import Path
 import logging
 import os
@@ -14,7 +13,9 @@ from src.core.config.models import (
     RedisSettings, 
     RedisCache, 
     ElasticSearch, 
-    Email_Settings
+    Email_Settings,
+    TextLoadConfig,
+    MediaStoreConfig
     )
 
 
@@ -27,9 +28,12 @@ logging.basicConfig(
 
 max_file_size_mb = 10
 max_file_size = (1024**2)*max_file_size_mb
+# Whole request body, the upload plus its multipart form fields
+max_request_size = max_file_size + 1024**2
 base_dir = Path(__file__).parent.parent.parent
-media_root = base_dir / "media_root" / datetime.now().date().strftime('%Y/%m/%d')
+media_root = base_dir / "media_root"
 frontend_root = base_dir / 'frontend' / 'templates'
+template_cache_root = base_dir / 'frontend' / '.template_cache'
 _core_env_file = Path(__file__).parent.parent.parent.parent / '.env'
 
 TOKEN_TYPE = "type"
@@ -62,6 +66,8 @@ class Settings(BaseSettings):
     redis_cache: RedisCache = RedisCache()
     elastic:ElasticSearch = ElasticSearch()
     email:Email_Settings = Email_Settings()
+    text_load:TextLoadConfig = TextLoadConfig()
+    media_store:MediaStoreConfig = MediaStoreConfig()
 
 settings = Settings()
 settings.db.give_url()
@@ -67,9 +67,28 @@ class RedisSettings(BaseModel):
 class RedisCache(BaseModel):
     REDIS_CACHE_TTL_BOOKS: timedelta = timedelta(hours=1) #86400  # Default: 24h (in seconds)
     REDIS_CACHE_TTL_SESSIONS: timedelta = timedelta(hours=1)  # Sessions expire in 1h
+    REDIS_CACHE_STALE_BOOKS: timedelta = timedelta(minutes=10)  # Served stale while one worker reloads
+    REDIS_CACHE_LEASE_BOOKS: timedelta = timedelta(seconds=30)  # Max time a single reload may hold the lease
+    REDIS_CACHE_EARLY_REFRESH_BETA: float = 1.0  # >1 refreshes earlier, 0 disables early refresh
+    LOCAL_CACHE_MAX_BYTES: int = 64 * 1024**2  # Per-worker in-process tier
+    INVALIDATION_CHANNEL: str = 'books:invalidate'
+
+
+class TextLoadConfig(BaseModel):
+    max_workers:int=4  # Threads reading and decoding book files, tune per core count
+    detect_sample_bytes:int=64*1024  # Prefix fed to charset detection
+
+
+class MediaStoreConfig(BaseModel):
+    grace_period:timedelta=timedelta(hours=1)  # A stored text claimed this recently is never collected; ISO 8601 in env, e.g. PT1H
+    sweep_interval:timedelta=timedelta(hours=1)  # How often unreferenced texts are swept
 
 
 class ElasticSearch(BaseModel):
     host:str='localhost'
     user:str='elasticuser'
-    password:str|None=None
\ No newline at end of file
+    password:str|None=None
+    index:str='books'
+    bulk_chunk_size:int=500  # Actions per bulk request
+    reindex_batch:int=50  # Books read from the database per reindex batch
+    max_in_flight:int=4  # Reindex batches being pushed at once
\ No newline at end of file
@@ -0,0 +1,53 @@
+from fastapi import FastAPI, HTTPException
+from starlette.datastructures import Headers
+from starlette.responses import PlainTextResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+import logging
+
+from src.core.config.config import max_request_size
+
+
+logger = logging.getLogger(__name__)
+
+
+class BodySizeLimitMiddleware:
+    """Reject request bodies larger than max_body_size while they are received.
+
+    A declared Content-Length over the limit is answered with 413 before any
+    of the body is read. Chunked bodies are counted as they arrive and
+    fail with 413 as soon as they pass the limit, so an upload is never
+    spooled to disk in full before the application sees it.
+    """
+    def __init__(self, app: ASGIApp, max_body_size: int):
+        self.app = app
+        self.max_body_size = max_body_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        content_length = Headers(scope=scope).get('content-length')
+        if content_length and content_length.isdigit() and int(content_length) > self.max_body_size:
+            logger.info(f'Rejected a {content_length} bytes body to {scope["path"]}')
+            response = PlainTextResponse('Request body exceeds the limit', status_code=413)
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message['type'] == 'http.request':
+                received += len(message.get('body', b''))
+                if received > self.max_body_size:
+                    # Raised inside the request handler, so FastAPI renders it as a 413
+                    raise HTTPException(status_code=413, detail='Request body exceeds the limit')
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+def init_body_size_middleware(app: FastAPI):
+    app.add_middleware(BodySizeLimitMiddleware, max_body_size=max_request_size)
@@ -8,6 +8,21 @@ class BookModelPydantic(BaseModel):
 
     tags:list[int]|None
 
+class StoredBookModelPydantic(BookModelPydantic):
+    """A book whose text was stored at ingest, with the columns derived from it.
+
+    Only built from book_process results, never from a request body.
+    """
+    source_encoding:str|None=None
+    byte_length:int|None=None
+    char_length:int|None=None
+    word_count:int|None=None
+    page_count:int|None=None
+    content_hash:str|None=None
+
+# Columns that describe the stored text and go stale when text_hook changes
+STORED_TEXT_FIELDS = tuple(i for i in StoredBookModelPydantic.model_fields if i not in BookModelPydantic.model_fields)
+
 class TagsModelPydantic(BaseModel):
     tag:str
 
@@ -0,0 +1,221 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+import logging
+import json
+
+from src.core.services.cache.redis_fastapi import redis
+from src.core.services.database.models.models import BookModelOrm
+
+
+logger = logging.getLogger(__name__)
+
+# Sorted set with every score 0, so members are ordered bytewise and
+# ZRANGEBYLEX answers a prefix with one range read.
+# Member: normalized phrase \0 kind \0 book id \0 title \0 author
+AUTOCOMPLETE_INDEX_KEY = 'autocomplete:index'
+# Hash of book id -> JSON list of that book's index members
+AUTOCOMPLETE_MEMBERS_KEY = 'autocomplete:members'
+# Sorted set of book id -> reader views
+AUTOCOMPLETE_POPULARITY_KEY = 'autocomplete:popularity'
+AUTOCOMPLETE_REBUILD_LOCK_KEY = 'autocomplete:rebuild'
+# Sorted set per short prefix of book id -> reader views, holding every book
+# with a word starting with that prefix. Short prefixes match too many index
+# members for a bounded lex read to find the most viewed, so these answer
+# them instead, at the cost of one entry per book and distinct word prefix.
+AUTOCOMPLETE_TOP_KEY = 'autocomplete:top:{}'
+
+# Index members read per lookup before ranking. Prefixes longer than
+# TOP_PREFIX_LEN are ranked among the first SCAN_LIMIT members in byte order,
+# which is exact unless more members than that share the prefix.
+SCAN_LIMIT = 200
+TOP_PREFIX_LEN = 3
+MAX_WORDS = 8  # A phrase also matches from each of its first words
+
+
+def normalize(text: str) -> str:
+    return ' '.join(text.casefold().split())
+
+
+class AutocompleteService:
+    @staticmethod
+    def _members(book_id: int, title: str, author: str | None) -> list[str]:
+        """Index members of a book: every word-started tail of its title and author."""
+        members = []
+        for kind, phrase in (('title', title), ('author', author)):
+            words = normalize(phrase or '').split(' ')
+            for start in range(min(len(words), MAX_WORDS)):
+                tail = ' '.join(words[start:])
+                if tail:
+                    members.append('\x00'.join((tail, kind, str(book_id), title, author or '')))
+        return list(dict.fromkeys(members))
+
+    @staticmethod
+    def _top_keys(members: list[str]) -> set[str]:
+        """Candidate sets a book belongs to: one per short prefix of its indexed words."""
+        prefixes = set()
+        for member in members:
+            tail = member.split('\x00', 1)[0]
+            for length in range(1, min(len(tail), TOP_PREFIX_LEN) + 1):
+                # normalize() never leaves a trailing space on a query
+                if tail[length - 1] != ' ':
+                    prefixes.add(tail[:length])
+        return {AUTOCOMPLETE_TOP_KEY.format(i) for i in prefixes}
+
+    @staticmethod
+    async def add_book(book_id: int, title: str, author: str | None) -> None:
+        """Index a book, replacing whatever was indexed for it before."""
+        await AutocompleteService.add_books([(book_id, title, author)])
+
+    @staticmethod
+    async def add_books(books: list[tuple[int, str, str | None]]) -> None:
+        """Index books, replacing whatever was indexed for them before, in two round trips."""
+        if not books:
+            return
+
+        ids = [book_id for book_id, _, _ in books]
+        async with redis.pipeline(transaction=False) as pipe:
+            pipe.hmget(AUTOCOMPLETE_MEMBERS_KEY, ids)
+            pipe.zmscore(AUTOCOMPLETE_POPULARITY_KEY, ids)
+            old_members, views = await pipe.execute()
+
+        async with redis.pipeline(transaction=True) as pipe:
+            for (book_id, title, author), old, score in zip(books, old_members, views):
+                old = json.loads(old) if old is not None else []
+                members = AutocompleteService._members(book_id, title, author)
+                top_keys = AutocompleteService._top_keys(members)
+                if old:
+                    pipe.zrem(AUTOCOMPLETE_INDEX_KEY, *old)
+                for key in AutocompleteService._top_keys(old) - top_keys:
+                    pipe.zrem(key, book_id)
+                if members:
+                    pipe.zadd(AUTOCOMPLETE_INDEX_KEY, dict.fromkeys(members, 0))
+                for key in top_keys:
+                    pipe.zadd(key, {book_id: score or 0})
+                pipe.hset(AUTOCOMPLETE_MEMBERS_KEY, book_id, json.dumps(members))
+            await pipe.execute()
+
+    @staticmethod
+    async def _drop_top_keys() -> None:
+        keys = [key async for key in redis.scan_iter(match=AUTOCOMPLETE_TOP_KEY.format('*'), count=1000)]
+        for index in range(0, len(keys), 1000):
+            await redis.delete(*keys[index:index + 1000])
+
+    @staticmethod
+    async def remove_book(book_id: int | None = None) -> None:
+        """Drop a book from the index, or every book when book_id is None."""
+        if book_id is None:
+            await redis.delete(AUTOCOMPLETE_INDEX_KEY, AUTOCOMPLETE_MEMBERS_KEY, AUTOCOMPLETE_POPULARITY_KEY)
+            await AutocompleteService._drop_top_keys()
+            return
+
+        old = await redis.hget(AUTOCOMPLETE_MEMBERS_KEY, book_id)
+        old = json.loads(old) if old is not None else []
+        async with redis.pipeline(transaction=True) as pipe:
+            if old:
+                pipe.zrem(AUTOCOMPLETE_INDEX_KEY, *old)
+            for key in AutocompleteService._top_keys(old):
+                pipe.zrem(key, book_id)
+            pipe.hdel(AUTOCOMPLETE_MEMBERS_KEY, book_id)
+            pipe.zrem(AUTOCOMPLETE_POPULARITY_KEY, book_id)
+            await pipe.execute()
+
+    @staticmethod
+    async def record_view(book_id: int) -> None:
+        members = await redis.hget(AUTOCOMPLETE_MEMBERS_KEY, book_id)
+        async with redis.pipeline(transaction=True) as pipe:
+            pipe.zincrby(AUTOCOMPLETE_POPULARITY_KEY, 1, book_id)
+            if members is not None:
+                for key in AutocompleteService._top_keys(json.loads(members)):
+                    pipe.zincrby(key, 1, book_id)
+            await pipe.execute()
+
+    @staticmethod
+    async def is_built() -> bool:
+        return bool(await redis.exists(AUTOCOMPLETE_MEMBERS_KEY))
+
+    @staticmethod
+    async def rebuild(session: AsyncSession, batch_size: int = 1000) -> int:
+        """Index every book from scratch; returns 0 when another rebuild is running."""
+        if not await redis.set(AUTOCOMPLETE_REBUILD_LOCK_KEY, 1, nx=True, ex=60):
+            return 0
+
+        try:
+            await redis.delete(AUTOCOMPLETE_INDEX_KEY, AUTOCOMPLETE_MEMBERS_KEY)
+            await AutocompleteService._drop_top_keys()
+            count = 0
+            result = await session.stream(
+                select(BookModelOrm.id, BookModelOrm.title, BookModelOrm.author)
+                .execution_options(yield_per=batch_size)
+            )
+            async for rows in result.partitions():
+                views = await redis.zmscore(AUTOCOMPLETE_POPULARITY_KEY, [row.id for row in rows])
+                async with redis.pipeline(transaction=False) as pipe:
+                    for row, score in zip(rows, views):
+                        members = AutocompleteService._members(row.id, row.title, row.author)
+                        if members:
+                            pipe.zadd(AUTOCOMPLETE_INDEX_KEY, dict.fromkeys(members, 0))
+                        for key in AutocompleteService._top_keys(members):
+                            pipe.zadd(key, {row.id: score or 0})
+                        pipe.hset(AUTOCOMPLETE_MEMBERS_KEY, row.id, json.dumps(members))
+                    await pipe.execute()
+                count += len(rows)
+            logger.info(f'Autocomplete index rebuilt for {count} books')
+            return count
+        finally:
+            await redis.delete(AUTOCOMPLETE_REBUILD_LOCK_KEY)
+
+    @staticmethod
+    def _match(members: list[str], prefix: str) -> dict | None:
+        """The suggestion for a book from its index members, preferring a title match."""
+        book = None
+        for member in members:
+            tail, kind, book_id, title, author = member.split('\x00')
+            if tail.startswith(prefix) and (book is None or (kind == 'title' and book['matched'] != 'title')):
+                book = {'id': int(book_id), 'title': title, 'author': author or None, 'matched': kind}
+        return book
+
+    @staticmethod
+    async def _suggest_top(prefix: str, limit: int) -> list[dict]:
+        """Most viewed books for a short prefix, read from its candidate set."""
+        ranked = await redis.zrevrange(AUTOCOMPLETE_TOP_KEY.format(prefix), 0, SCAN_LIMIT - 1, withscores=True)
+        if len(ranked) > limit:
+            # Keep every book tied with the last one, so ties can be broken by title
+            ranked = [(book_id, score) for book_id, score in ranked if score >= ranked[limit - 1][1]]
+        if not ranked:
+            return []
+
+        members = await redis.hmget(AUTOCOMPLETE_MEMBERS_KEY, [book_id for book_id, _ in ranked])
+        books = []
+        for (_, score), book_members in zip(ranked, members):
+            book = AutocompleteService._match(json.loads(book_members), prefix) if book_members else None
+            if book is not None:
+                book['views'] = int(score)
+                books.append(book)
+        return sorted(books, key=lambda i: (-i['views'], i['title']))[:limit]
+
+    @staticmethod
+    async def suggest(prefix: str, limit: int = 10) -> list[dict]:
+        """Books whose title or author has a word starting with prefix, most viewed first."""
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        if len(prefix) <= TOP_PREFIX_LEN:
+            return await AutocompleteService._suggest_top(prefix, limit)
+
+        start = b'[' + prefix.encode('utf-8')
+        # 0xff never occurs in UTF-8, so this bounds every member with the prefix
+        members = await redis.zrangebylex(AUTOCOMPLETE_INDEX_KEY, start, start + b'\xff', start=0, num=SCAN_LIMIT)
+
+        books = {}
+        for member in members:
+            _, kind, book_id, title, author = member.decode('utf-8').split('\x00')
+            book_id = int(book_id)
+            if book_id not in books or (kind == 'title' and books[book_id]['matched'] != 'title'):
+                books[book_id] = {'id': book_id, 'title': title, 'author': author or None, 'matched': kind}
+        if not books:
+            return []
+
+        scores = await redis.zmscore(AUTOCOMPLETE_POPULARITY_KEY, list(books))
+        for book, score in zip(books.values(), scores):
+            book['views'] = int(score or 0)
+        return sorted(books.values(), key=lambda i: (-i['views'], i['title']))[:limit]
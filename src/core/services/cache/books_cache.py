@@ -1,56 +1,575 @@
+from collections import OrderedDict
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Any, Awaitable, Callable, Iterable
+from uuid import uuid4
 import logging
+import asyncio
+import random
+import codecs
 import gzip
+import math
+import time
+import sys
+import re
+
+from redis.exceptions import ConnectionError as RedisConnectionError
 
 from src.core.config.config import settings
 from src.core.services.cache.redis_fastapi import redis
 from src.core.services.database.models.models import BookModelOrm
-from src.utils.TextLoad import TextLoad
+from src.utils.TextLoad import TextLoad, run_blocking
+from src.utils.Pagination_text import page_offsets, iter_page_offsets
 
 
 logger = logging.getLogger(__name__)
 
+# Each page occupies two unsigned 64-bit byte offsets (start, end) in the index
+_OFFSET_TYPECODE = 'Q'
+_PAGE_ENTRY_SIZE = 2 * array(_OFFSET_TYPECODE).itemsize
+# Bumped when page boundaries change, so indexes persisted before are rebuilt
+_PAGE_INDEX_VERSION = b'2'
+
+_WORD = re.compile(r'\w+')
+
+
+class SearchIndex:
+    """Positional word index of one book text.
+
+    words maps a casefolded word to the ordinals of its occurrences,
+    word_starts the ordinal of every word to its character offset, and
+    page_starts holds the first character offset of every reader page.
+    """
+    def __init__(self, text: str):
+        self.words: dict[str, array] = {}
+        self.word_starts = array('L')
+        for ordinal, match in enumerate(_WORD.finditer(text)):
+            self.word_starts.append(match.start())
+            self.words.setdefault(match.group().casefold(), array('L')).append(ordinal)
+        self.page_starts = array('L', (start for start, _ in iter_page_offsets(text)))
+
+    @property
+    def size(self) -> int:
+        """Approximate memory held, in bytes."""
+        arrays = [self.word_starts, self.page_starts, *self.words.values()]
+        return sum(sys.getsizeof(i) for i in arrays) + sum(sys.getsizeof(i) for i in self.words) + sys.getsizeof(self.words)
+
+    def find(self, terms: list[str], after: int = -1) -> list[int]:
+        """Ordinals of the first word of every occurrence of the phrase, past after."""
+        postings = [self.words.get(term) for term in terms]
+        if not all(postings):
+            return []
+
+        first = postings[0]
+        found = []
+        for ordinal in first[bisect_right(first, after):]:
+            if all(self._contains(postings[i], ordinal + i) for i in range(1, len(terms))):
+                found.append(ordinal)
+        return found
+
+    def page_of(self, offset: int) -> int:
+        return bisect_right(self.page_starts, offset)
+
+    @staticmethod
+    def _contains(postings: array, ordinal: int) -> bool:
+        position = bisect_left(postings, ordinal)
+        return position < len(postings) and postings[position] == ordinal
+
+
+class LocalCache:
+    """In-process LRU bounded by the total size of the stored values, in bytes."""
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict[str, tuple[Any, int]] = OrderedDict()
+
+    def get(self, key: str) -> Any | None:
+        item = self._data.get(key)
+        if item is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._data.move_to_end(key)
+        return item[0]
+
+    def set(self, key: str, value: Any, size: int) -> None:
+        if size > self.max_bytes:
+            return
+        self.pop(key)
+        self._data[key] = (value, size)
+        self.size += size
+        while self.size > self.max_bytes:
+            _, (_, evicted_size) = self._data.popitem(last=False)
+            self.size -= evicted_size
+
+    def pop(self, key: str) -> None:
+        item = self._data.pop(key, None)
+        if item is not None:
+            self.size -= item[1]
+
+    def pop_prefix(self, prefix: str) -> None:
+        for key in [key for key in self._data if key.startswith(prefix)]:
+            self.pop(key)
+
+    def clear(self) -> None:
+        self._data.clear()
+        self.size = 0
+
+
+local_cache = LocalCache(settings.redis_cache.LOCAL_CACHE_MAX_BYTES)
+redis_stats = {'hits': 0, 'misses': 0}
+
+# Loads currently running in this worker, keyed by cache key
+_inflight: dict[str, asyncio.Future] = {}
+# Strong references to background refresh tasks
+_refresh_tasks: set[asyncio.Task] = set()
+
+_release_lease = redis.register_script(
+    "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end return 0"
+)
+
+
 class BookCacheService:
     @staticmethod
     async def get_book_text(book_data: BookModelOrm) -> str:
         """Retrieve book text from cache or source, with compression handling."""
-        cached_text = None
         if book_data:
-            cached_text = await redis.get(book_data.text_hook)
-            logger.info(f'Cache {"hit" if cached_text else "miss"} for book {book_data.id}')
+            local_key = f'{BookCacheService._cache_prefix(book_data)}:text'
+            local = local_cache.get(local_key)
+            if local and local[0] == str(book_data.text_hook):
+                return local[1]
 
-            if cached_text:
-                try:
-                    return gzip.decompress(cached_text).decode()
-                except gzip.BadGzipFile:
-                    return cached_text.decode()
-            
-            text_load = TextLoad(book_data)
-            content = text_load.push_text()
-            await BookCacheService._cache_book_text(book_data.text_hook, content)
+            content = await BookCacheService._single_flight(
+                str(book_data.text_hook),
+                lambda: BookCacheService._fetch_book_text(book_data)
+                )
+            local_cache.set(local_key, (str(book_data.text_hook), content), sys.getsizeof(content))
             return content
         return 'No text'
 
     @staticmethod
-    async def _cache_book_text(key: str, content: str) -> None:
-        """Store book text in cache with compression."""
+    async def _fetch_book_text(book_data: BookModelOrm) -> str:
+        """Read the book text from Redis, serving stale values while one worker reloads.
+
+        The text is kept past its logical expiry for REDIS_CACHE_STALE_BOOKS.
+        A stale hit, or an early refresh picked with probability growing as
+        expiry nears (XFetch), is answered from cache and reloaded in the
+        background. Only a hard miss makes the caller wait for a load.
+        """
+        key = str(book_data.text_hook)
+        async with redis.pipeline(transaction=False) as pipe:
+            pipe.get(key)
+            pipe.get(f'{key}:fresh')
+            cached_text, fresh = await pipe.execute()
+
+        BookCacheService._count_redis(cached_text)
+        logger.info(f'Cache {"hit" if cached_text else "miss"} for book {book_data.id}')
+
+        if not cached_text:
+            return await BookCacheService._load_book_text(book_data)
+
+        if fresh is None or BookCacheService._should_refresh_early(fresh):
+            BookCacheService._schedule_refresh(book_data)
+
+        try:
+            return gzip.decompress(cached_text).decode()
+        except gzip.BadGzipFile:
+            return cached_text.decode()
+
+    @staticmethod
+    async def _load_book_text(book_data: BookModelOrm, wait: bool = True) -> str | None:
+        """Load the text from disk under a Redis lease so one worker reloads a key at a time.
+
+        Callers that lose the lease poll Redis for the winner's value; with
+        wait=False they give up at once instead.
+        """
+        key = str(book_data.text_hook)
+        lease_key = f'{key}:lease'
+        lease_ttl = settings.redis_cache.REDIS_CACHE_LEASE_BOOKS
+        token = uuid4().hex
+
+        if await redis.set(lease_key, token, nx=True, px=lease_ttl):
+            try:
+                started = time.monotonic()
+                content = await TextLoad(book_data).apush_text()
+                await BookCacheService._cache_book_text(key, content, time.monotonic() - started)
+                return content
+            finally:
+                await _release_lease(keys=[lease_key], args=[token])
+
+        if not wait:
+            return None
+
+        deadline = time.monotonic() + lease_ttl.total_seconds()
+        while time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+            cached_text = await redis.get(key)
+            if cached_text:
+                return gzip.decompress(cached_text).decode()
+
+        # The lease holder died without publishing a value
+        logger.warning(f'Lease on book {book_data.id} expired, loading it directly')
+        content = await TextLoad(book_data).apush_text()
+        await BookCacheService._cache_book_text(key, content)
+        return content
+
+    @staticmethod
+    def _should_refresh_early(fresh: bytes) -> bool:
+        expiry, delta = map(float, fresh.split(b':'))
+        beta = settings.redis_cache.REDIS_CACHE_EARLY_REFRESH_BETA
+        return time.time() - delta * beta * math.log(1 - random.random()) >= expiry
+
+    @staticmethod
+    def _schedule_refresh(book_data: BookModelOrm) -> None:
+        key = f'refresh:{book_data.text_hook}'
+        if key in _inflight:
+            return
+
+        task = asyncio.create_task(BookCacheService._single_flight(
+            key,
+            lambda: BookCacheService._load_book_text(book_data, wait=False)
+            ))
+        _refresh_tasks.add(task)
+        task.add_done_callback(BookCacheService._refresh_done)
+
+    @staticmethod
+    def _refresh_done(task: asyncio.Task) -> None:
+        _refresh_tasks.discard(task)
+        if not task.cancelled() and task.exception():
+            logger.error(f'Background book refresh failed: {task.exception()}')
+
+    @staticmethod
+    async def _single_flight(key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Run loader once per key in this worker; concurrent callers share its result.
+
+        The load runs as its own task and every caller, the first included,
+        awaits it through shield, so cancelling one request never fails the others.
+        """
+        task = _inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(loader())
+            _inflight[key] = task
+            task.add_done_callback(lambda done: BookCacheService._single_flight_done(key, done))
+        return await asyncio.shield(task)
+
+    @staticmethod
+    def _single_flight_done(key: str, task: asyncio.Future) -> None:
+        if _inflight.get(key) is task:
+            del _inflight[key]
+        if not task.cancelled():
+            task.exception()  # Retrieved here so waiterless failures are not logged as unhandled
+
+    @staticmethod
+    async def get_book_page(book_data: BookModelOrm, book_page: int) -> tuple[str | None, int]:
+        """Return one reader page of the book and the total page count.
+
+        Pages are cached one by one under {prefix}:page:{n}, so a hit costs a
+        single small GET and decompress. On a miss only the requested byte
+        range is read from disk, using the page index built on the first read.
+        Content is None when book_page is out of range. The hottest pages are
+        also kept decompressed in the per-worker local cache.
+        """
+        prefix = BookCacheService._cache_prefix(book_data)
+        local_key = BookCacheService._page_key(prefix, book_page)
+        local = local_cache.get(local_key)
+        if local and local[0] == str(book_data.text_hook):
+            return local[2], local[1]
+
+        header_key = BookCacheService._index_keys(prefix)[0]
+
+        async with redis.pipeline(transaction=False) as pipe:
+            pipe.hmget(header_key, 'text_hook', 'pages', 'version')
+            pipe.get(local_key)
+            (text_hook, pages, version), cached_page = await pipe.execute()
+
+        if text_hook is None or text_hook.decode() != str(book_data.text_hook) or version != _PAGE_INDEX_VERSION:
+            logger.info(f'Page index miss for book {book_data.id}')
+            count = await BookCacheService._single_flight(
+                header_key,
+                lambda: BookCacheService._build_page_index(book_data)
+                )
+            cached_page = None
+        else:
+            count = int(pages)
+
+        if not 1 <= book_page <= count:
+            return None, count
+
+        BookCacheService._count_redis(cached_page)
+        logger.info(f'Cache {"hit" if cached_page else "miss"} for book {book_data.id} page {book_page}')
+        if cached_page:
+            content = gzip.decompress(cached_page).decode()
+        else:
+            content = await BookCacheService._load_page(book_data, book_page)
+
+        if content is not None:
+            local_cache.set(local_key, (str(book_data.text_hook), count, content), sys.getsizeof(content))
+        return content, count
+
+    @staticmethod
+    async def warm_pages(book_data: BookModelOrm, book_pages: Iterable[int]) -> None:
+        """Preload the given pages into the cache, skipping those already cached."""
+        prefix = BookCacheService._cache_prefix(book_data)
+        book_pages = list(book_pages)
+        if await redis.hget(BookCacheService._index_keys(prefix)[0], 'version') != _PAGE_INDEX_VERSION:
+            await BookCacheService._build_page_index(book_data)
+
+        async with redis.pipeline(transaction=False) as pipe:
+            for book_page in book_pages:
+                pipe.exists(BookCacheService._page_key(prefix, book_page))
+            cached = await pipe.execute()
+
+        for book_page, hit in zip(book_pages, cached):
+            if not hit:
+                await BookCacheService._load_page(book_data, book_page)
+
+    @staticmethod
+    async def evict_pages(book_data: BookModelOrm, book_pages: Iterable[int]) -> None:
+        """Remove the given pages from the cache, leaving the rest of the book."""
+        prefix = BookCacheService._cache_prefix(book_data)
+        keys = [BookCacheService._page_key(prefix, n) for n in book_pages]
+        for key in keys:
+            local_cache.pop(key)
+        if keys:
+            await redis.delete(*keys)
+
+    @staticmethod
+    async def _load_page(book_data: BookModelOrm, book_page: int) -> str | None:
+        """Read one page from disk through the page index and cache it compressed."""
+        prefix = BookCacheService._cache_prefix(book_data)
+        header_key, offsets_key = BookCacheService._index_keys(prefix)
+        entry_start = (book_page - 1) * _PAGE_ENTRY_SIZE
+
+        async with redis.pipeline(transaction=False) as pipe:
+            pipe.hget(header_key, 'encoding')
+            pipe.getrange(offsets_key, entry_start, entry_start + _PAGE_ENTRY_SIZE - 1)
+            encoding, entry = await pipe.execute()
+
+        if encoding is None or len(entry) != _PAGE_ENTRY_SIZE:
+            return None
+
+        start, end = array(_OFFSET_TYPECODE, entry)
+        content = await TextLoad(book_data).apush_slice(start, end, encoding.decode())
+        await redis.set(
+            BookCacheService._page_key(prefix, book_page),
+            gzip.compress(content.encode()),
+            ex=settings.redis_cache.REDIS_CACHE_TTL_BOOKS
+            )
+        return content
+
+    @staticmethod
+    async def _build_page_index(book_data: BookModelOrm) -> int:
+        """Paginate the stored text once and persist the byte offsets of every page."""
+        text, encoding = await TextLoad(book_data).apush_raw_text()
+        offsets = await run_blocking(
+            lambda: BookCacheService._byte_offsets(text, BookCacheService._raw_page_offsets(text), encoding)
+            )
+        count = len(offsets) // 2
+
+        prefix = BookCacheService._cache_prefix(book_data)
+        await BookCacheService._invalidate(prefix)
+        header_key, offsets_key = BookCacheService._index_keys(prefix)
+        async with redis.pipeline(transaction=True) as pipe:
+            pipe.set(offsets_key, offsets.tobytes())
+            pipe.hset(header_key, mapping={
+                'text_hook': str(book_data.text_hook),
+                'encoding': encoding,
+                'pages': count,
+                'version': _PAGE_INDEX_VERSION
+            })
+            await pipe.execute()
+        return count
+
+    @staticmethod
+    def _raw_page_offsets(text: str) -> list[tuple[int, int]]:
+        """Page offsets of the newline-translated text, mapped onto text as stored.
+
+        Pages are cut where they are in TextLoad.push_text, so the reader, find
+        in book and both search indexes agree on page numbers. Each \\r\\n
+        collapsed to \\n there shifts every later offset here by one.
+        """
+        translated = text.replace('\r\n', '\n').replace('\r', '\n')
+        if len(translated) == len(text):
+            return page_offsets(translated)
+
+        # Translated offset of the \n of every collapsed \r\n
+        collapsed = array('q', (match.start() - number for number, match in enumerate(re.finditer('\r\n', text))))
+        return [
+            (start + bisect_left(collapsed, start), end + bisect_left(collapsed, end))
+            for start, end in iter_page_offsets(translated)
+        ]
+
+    @staticmethod
+    def _byte_offsets(text: str, offsets: list[tuple[int, int]], encoding: str) -> array:
+        """Translate character offsets of text into byte offsets of its encoded form."""
+        encoder = codecs.getincrementalencoder(encoding)(errors='surrogateescape')
+        byte_offsets = array(_OFFSET_TYPECODE)
+        position = consumed = 0
+
+        for bound in (bound for pair in offsets for bound in pair):
+            consumed += len(encoder.encode(text[position:bound]))
+            position = bound
+            byte_offsets.append(consumed)
+        return byte_offsets
+
+    @staticmethod
+    async def find_in_book(
+            book_data: BookModelOrm,
+            query: str,
+            after: int = -1,
+            limit: int = 50,
+            context: int = 80
+            ) -> tuple[list[dict], int]:
+        """Occurrences of query in the book with a snippet and the reader page of each.
+
+        The word index is built from the text once per book and kept in the
+        local cache; later searches look words up instead of scanning the text.
+        Returns at most limit matches past the word ordinal after, and the
+        total number of matches past it.
+        """
+        terms = [term.casefold() for term in _WORD.findall(query)]
+        if not terms:
+            return [], 0
+
+        index = await BookCacheService._get_search_index(book_data)
+        text = await BookCacheService.get_book_text(book_data)
+        found = index.find(terms, after)
+
+        matches = []
+        for ordinal in found[:limit]:
+            start = index.word_starts[ordinal]
+            end = _WORD.match(text, index.word_starts[ordinal + len(terms) - 1]).end()
+            matches.append({
+                'ordinal': ordinal,
+                'page': index.page_of(start),
+                'snippet': text[max(0, start - context):end + context],
+                'offset': start - max(0, start - context),
+                'length': end - start
+            })
+        return matches, len(found)
+
+    @staticmethod
+    async def _get_search_index(book_data: BookModelOrm) -> SearchIndex:
+        key = f'{BookCacheService._cache_prefix(book_data)}:search_index'
+        local = local_cache.get(key)
+        if local and local[0] == str(book_data.text_hook):
+            return local[1]
+
+        async def build() -> SearchIndex:
+            text = await BookCacheService.get_book_text(book_data)
+            return await run_blocking(SearchIndex, text)
+
+        index = await BookCacheService._single_flight(key, build)
+        local_cache.set(key, (str(book_data.text_hook), index), index.size)
+        return index
+
+    @staticmethod
+    def _cache_prefix(book_data: BookModelOrm) -> str:
+        """Key prefix of a book's cache entries.
+
+        Content-addressed files are immutable, so their entries are keyed by
+        content hash and shared by every title stored with the same text.
+        """
+        content_hash = getattr(book_data, 'content_hash', None)
+        return f'text:{content_hash}' if content_hash else f'book:{book_data.id}'
+
+    @staticmethod
+    def _index_keys(prefix: str) -> tuple[str, str]:
+        return f'{prefix}:header', f'{prefix}:offsets'
+
+    @staticmethod
+    def _page_key(prefix: str, book_page: int) -> str:
+        return f'{prefix}:page:{book_page}'
+
+    @staticmethod
+    async def invalidate_book(book_id: int) -> None:
+        """Drop the id-keyed cache entries of a book whose text was replaced or deleted."""
+        await BookCacheService._invalidate(f'book:{book_id}')
+
+    @staticmethod
+    async def invalidate_content(content_hash: str) -> None:
+        """Drop the cache entries of a stored text that was garbage-collected."""
+        await BookCacheService._invalidate(f'text:{content_hash}')
+
+    @staticmethod
+    async def _invalidate(prefix: str) -> None:
+        """Drop the page index and every cached page under prefix.
+
+        Other workers drop their local copies when they receive the
+        invalidation message published here.
+        """
+        local_cache.pop_prefix(f'{prefix}:')
+        pages = await redis.hget(BookCacheService._index_keys(prefix)[0], 'pages')
+        page_keys = [BookCacheService._page_key(prefix, n) for n in range(1, int(pages or 0) + 1)]
+        await redis.delete(*BookCacheService._index_keys(prefix), *page_keys)
+        await redis.publish(settings.redis_cache.INVALIDATION_CHANNEL, prefix)
+
+    @staticmethod
+    async def listen_invalidations() -> None:
+        """Evict local entries of books invalidated by any worker. Runs for the app lifetime."""
+        while True:
+            pubsub = redis.pubsub()
+            try:
+                await pubsub.subscribe(settings.redis_cache.INVALIDATION_CHANNEL)
+                async for message in pubsub.listen():
+                    if message['type'] == 'message':
+                        local_cache.pop_prefix(f'{message["data"].decode()}:')
+            except RedisConnectionError as err:
+                # Messages may have been missed while disconnected
+                logger.warning(f'Cache invalidation listener lost connection: {err}')
+                local_cache.clear()
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.aclose()
+
+    @staticmethod
+    def _count_redis(value: bytes | None) -> None:
+        redis_stats['hits' if value else 'misses'] += 1
+
+    @staticmethod
+    async def _cache_book_text(key: str, content: str, delta: float = 0.0) -> None:
+        """Store book text in cache with compression.
+
+        The value outlives its freshness marker by REDIS_CACHE_STALE_BOOKS so
+        it can still be served while it is being reloaded. delta is the load
+        time in seconds, used to scale the early refresh probability.
+        """
+        ttl = settings.redis_cache.REDIS_CACHE_TTL_BOOKS
         compressed = gzip.compress(content.encode())
-        await redis.set(key, compressed, ex=settings.redis_cache.REDIS_CACHE_TTL_BOOKS)
+        async with redis.pipeline(transaction=True) as pipe:
+            pipe.set(key, compressed, ex=ttl + settings.redis_cache.REDIS_CACHE_STALE_BOOKS)
+            pipe.set(f'{key}:fresh', f'{time.time() + ttl.total_seconds()}:{delta}', ex=ttl)
+            await pipe.execute()
 
     @staticmethod
     async def get_cache_stats() -> dict:
-        """Return Redis memory and hit rate statistics."""
+        """Return Redis memory and hit rate statistics, plus per-tier counters of this worker."""
         memory_info = await redis.info("MEMORY")
         stats = await redis.info("STATS")
         
         hits = stats["keyspace_hits"]
         misses = stats["keyspace_misses"]
         hit_rate = hits / (hits + misses) if (hits + misses) > 0 else 0
+        tiers = {
+            'local': {'hits': local_cache.hits, 'misses': local_cache.misses, 'bytes': local_cache.size},
+            'redis': dict(redis_stats)
+        }
         logger.info(
         f"Cache stats - Memory: {memory_info['used_memory_human']} "
         f"Hit Rat: {hit_rate:.2%} "
         f"hits: {hits} "
         f"misses: {misses} "
+        f"tiers: {tiers} "
     )
+        return {
+            'memory': memory_info['used_memory_human'],
+            'hit_rate': hit_rate,
+            'hits': hits,
+            'misses': misses,
+            'tiers': tiers
+        }
         
     @staticmethod
     async def get_page_to_user(key:str) -> int|None:
@@ -0,0 +1,74 @@
+import logging
+import json
+
+from src.core.config.config import settings
+from src.core.services.cache.redis_fastapi import redis
+
+
+logger = logging.getLogger(__name__)
+
+# Bumped on every catalog change. Everything cached below is keyed by it, so
+# a value computed before a change can never be read after it:
+# catalog:{version}:total_books, the number of books
+# catalog:{version}:anchors, hash of page number -> (title, id) of the last book before that page
+# catalog:{version}:page:{n}, the rendered book list of a page
+VERSION_KEY = 'catalog:version'
+
+class CatalogCacheService:
+    @staticmethod
+    async def get_version() -> int:
+        version = await redis.get(VERSION_KEY)
+        return int(version) if version is not None else 0
+
+    @staticmethod
+    async def get_total_books(version: int) -> int | None:
+        """Cached number of books in the catalog at version, None on a miss."""
+        total = await redis.get(f'catalog:{version}:total_books')
+        logger.debug(f'Catalog total cache {"hit" if total is not None else "miss"}')
+        return int(total) if total is not None else None
+
+    @staticmethod
+    async def set_total_books(version: int, total: int) -> None:
+        await redis.set(f'catalog:{version}:total_books', total, ex=settings.redis_cache.REDIS_CACHE_TTL_BOOKS)
+
+    @staticmethod
+    async def get_anchor(version: int, page: int) -> tuple[str, int] | None:
+        anchor = await redis.hget(f'catalog:{version}:anchors', page)
+        return tuple(json.loads(anchor)) if anchor is not None else None
+
+    @staticmethod
+    async def set_anchor(version: int, page: int, anchor: tuple[str, int]) -> None:
+        key = f'catalog:{version}:anchors'
+        async with redis.pipeline(transaction=True) as pipe:
+            pipe.hset(key, page, json.dumps(anchor))
+            pipe.expire(key, settings.redis_cache.REDIS_CACHE_TTL_BOOKS)
+            await pipe.execute()
+
+    @staticmethod
+    def _fragment_key(version: int, page: int) -> str:
+        return f'catalog:{version}:page:{page}'
+
+    @staticmethod
+    async def get_fragment(version: int, page: int) -> str | None:
+        """Rendered book list of a page at the given catalog version, None on a miss."""
+        fragment = await redis.get(CatalogCacheService._fragment_key(version, page))
+        logger.debug(f'Catalog page {page} fragment cache {"hit" if fragment is not None else "miss"}')
+        return fragment.decode('utf-8') if fragment is not None else None
+
+    @staticmethod
+    async def set_fragment(version: int, page: int, fragment: str) -> None:
+        # Entries of older versions are never read again and simply expire
+        await redis.set(
+            CatalogCacheService._fragment_key(version, page),
+            fragment,
+            ex=settings.redis_cache.REDIS_CACHE_TTL_BOOKS
+        )
+
+    @staticmethod
+    async def invalidate() -> None:
+        """Forget cached catalog data after books were inserted, renamed or deleted.
+
+        Called after the change is committed: a reader that saw the old
+        version also read the old rows, and caches them under that version.
+        """
+        await redis.incr(VERSION_KEY)
@@ -0,0 +1,82 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+import logging
+import json
+
+from src.core.services.cache.redis_fastapi import redis
+from src.core.services.database.models.models import TagsModelOrm
+
+
+logger = logging.getLogger(__name__)
+
+TAGS_VERSION_KEY = 'tags:version'
+TAGS_CATALOG_KEY = 'tags:catalog'
+
+class TagCacheService:
+    """Versioned tag catalog, held per worker and shared through Redis.
+
+    Every tag write bumps tags:version. A worker answers from its own copy
+    while that copy's version matches Redis, so reading the catalog costs
+    one small GET and no database work in steady state. The name -> id map
+    used to resolve submitted tags is tied to the version it was filled at
+    and dropped as soon as Redis reports a newer one, so a tag deleted or
+    re-created by any worker is never resolved to a stale id.
+    """
+    _ids: dict[str, int] = {}
+    _ids_version: int | None = None
+    _catalog: tuple[int, list[dict]] | None = None
+
+    @staticmethod
+    async def get_catalog(session: AsyncSession) -> tuple[int, list[dict]]:
+        """Current catalog version and every tag as {'id', 'tag'}."""
+        version = int(await redis.get(TAGS_VERSION_KEY) or 0)
+        if TagCacheService._catalog and TagCacheService._catalog[0] == version:
+            return TagCacheService._catalog
+
+        cached = await redis.get(TAGS_CATALOG_KEY)
+        catalog = json.loads(cached) if cached else None
+        if catalog is None or catalog['version'] != version:
+            logger.debug(f'Tag catalog miss for version {version}')
+            result = await session.execute(select(TagsModelOrm.id, TagsModelOrm.tag).order_by(TagsModelOrm.id))
+            catalog = {'version': version, 'tags': [{'id': i.id, 'tag': i.tag} for i in result.all()]}
+            await redis.set(TAGS_CATALOG_KEY, json.dumps(catalog))
+
+        TagCacheService._catalog = (version, catalog['tags'])
+        TagCacheService._ids = {i['tag']: i['id'] for i in catalog['tags']}
+        TagCacheService._ids_version = version
+        return TagCacheService._catalog
+
+    @staticmethod
+    async def invalidate() -> None:
+        """Publish a new catalog version after tags were inserted, updated or deleted."""
+        async with redis.pipeline(transaction=True) as pipe:
+            pipe.incr(TAGS_VERSION_KEY)
+            pipe.delete(TAGS_CATALOG_KEY)
+            await pipe.execute()
+
+    @staticmethod
+    async def lookup(names: list[str]) -> tuple[int, dict[str, int]]:
+        """Current tags:version and the cached ids of names that are valid for it."""
+        version = int(await redis.get(TAGS_VERSION_KEY) or 0)
+        if version != TagCacheService._ids_version:
+            TagCacheService._ids = {}
+            TagCacheService._ids_version = version
+        return version, {name: TagCacheService._ids[name] for name in names if name in TagCacheService._ids}
+
+    @staticmethod
+    def remember(mapping: dict[str, int], version: int) -> None:
+        """Cache ids read from the database while tags:version was version."""
+        if version == TagCacheService._ids_version:
+            TagCacheService._ids.update(mapping)
+
+    @staticmethod
+    def forget(tag_ids: list[int]) -> None:
+        tag_ids = set(tag_ids)
+        for name in [name for name, tag_id in TagCacheService._ids.items() if tag_id in tag_ids]:
+            del TagCacheService._ids[name]
+
+    @staticmethod
+    def clear() -> None:
+        TagCacheService._ids.clear()
+        TagCacheService._ids_version = None
+        TagCacheService._catalog = None
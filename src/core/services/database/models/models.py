@@ -1,10 +1,19 @@
 from src.core.services.database.models.base import Base, int_pk, created_at, updated_at, str_uniq
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import ForeignKey
+from sqlalchemy import ForeignKey, BigInteger, String, Index, Computed
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from datetime import date
 
+# Text search configuration of every tsvector column and search query
+search_config = 'english'
+
+
 class BookModelOrm(Base):
     __tablename__ = 'books'
+    __table_args__ = (
+        Index('ix_books_title_id', 'title', 'id'),  # Catalog keyset order
+        Index('ix_books_search_vector', 'search_vector', postgresql_using='gin'),
+    )
 
     id:Mapped[int_pk]
     title:Mapped[str_uniq] = mapped_column(index=True)
@@ -13,6 +22,24 @@ class BookModelOrm(Base):
     created_at:Mapped[created_at]
     updated_at:Mapped[updated_at]
     text_hook:Mapped[str|None]
+    # Set when the stored file was normalized to UTF-8 at ingest
+    source_encoding:Mapped[str|None]
+    byte_length:Mapped[int|None] = mapped_column(BigInteger)
+    char_length:Mapped[int|None] = mapped_column(BigInteger)
+    word_count:Mapped[int|None] = mapped_column(BigInteger)
+    page_count:Mapped[int|None]
+    # SHA-256 of the stored text, which lives at its content address
+    content_hash:Mapped[str|None] = mapped_column(String(64), index=True)
+    # Title (weight A) and author (weight B), kept current by Postgres
+    search_vector:Mapped[str|None] = mapped_column(
+        TSVECTOR,
+        Computed(
+            f"setweight(to_tsvector('{search_config}', coalesce(title, '')), 'A') || "
+            f"setweight(to_tsvector('{search_config}', coalesce(author, '')), 'B')",
+            persisted=True
+        ),
+        deferred=True
+    )
 
     tag_books:Mapped[list['TagsModelOrm']] = relationship(
         'TagsModelOrm',
@@ -52,4 +79,19 @@ class TagsOnBookOrm(Base):
     tag_id:Mapped[int] = mapped_column(
         ForeignKey('tags.id', ondelete='CASCADE'),
         primary_key=True
-    )
\ No newline at end of file
+    )
+
+
+class BookChunkOrm(Base):
+    """Search vector of one reader page of a book's text."""
+    __tablename__ = 'book_chunks'
+    __table_args__ = (
+        Index('ix_book_chunks_content_vector', 'content_vector', postgresql_using='gin'),
+    )
+
+    book_id:Mapped[int] = mapped_column(
+        ForeignKey('books.id', ondelete='CASCADE'),
+        primary_key=True,
+    )
+    page:Mapped[int] = mapped_column(primary_key=True)
+    content_vector:Mapped[str] = mapped_column(TSVECTOR)
\ No newline at end of file
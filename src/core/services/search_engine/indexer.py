@@ -0,0 +1,213 @@
+from elasticsearch import AsyncElasticsearch, ApiError, BadRequestError, TransportError
+from elasticsearch.helpers import async_bulk
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from collections import deque
+import asyncio
+import logging
+
+from src.core.config.config import settings
+from src.core.services.cache.redis_fastapi import redis
+from src.core.services.database.models.models import BookModelOrm
+from src.core.services.search_engine.ElasticSearch import search_engine
+from src.utils.Pagination_text import iter_page_offsets
+from src.utils.TextLoad import TextLoad
+
+
+logger = logging.getLogger(__name__)
+
+# Id of the last book whose reindex batch was fully pushed
+REINDEX_CHECKPOINT_KEY = 'search:reindex:after'
+
+INDEX_MAPPINGS = {
+    'properties': {
+        'kind': {'type': 'keyword'},  # 'book' for metadata, 'page' for a reader page
+        'book_id': {'type': 'integer'},
+        'page': {'type': 'integer'},
+        'title': {'type': 'text'},
+        'author': {'type': 'text'},
+        'content': {'type': 'text'},
+    }
+}
+
+
+class BookIndexer:
+    """Pushes books to Elasticsearch: one metadata document plus one per reader page.
+
+    The client is injected so the pipeline runs against any single-node
+    cluster or an in-memory fake that implements the few calls used here.
+    """
+    def __init__(self, client: AsyncElasticsearch = search_engine, index: str = settings.elastic.index):
+        self.client = client
+        self.index = index
+
+    async def ensure_index(self) -> None:
+        if not await self.client.indices.exists(index=self.index):
+            try:
+                await self.client.indices.create(index=self.index, mappings=INDEX_MAPPINGS)
+            except BadRequestError as err:
+                # Another worker created it since the check
+                if err.error != 'resource_already_exists_exception':
+                    raise
+
+    async def _actions(self, book_id: int, book, with_pages: bool = True):
+        yield {
+            '_index': self.index,
+            '_id': f'book-{book_id}',
+            '_source': {'kind': 'book', 'book_id': book_id, 'title': book.title, 'author': book.author},
+        }
+        if not (with_pages and book.text_hook):
+            return
+
+        text = await TextLoad(book).apush_text()
+        for number, (start, end) in enumerate(iter_page_offsets(text), start=1):
+            yield {
+                '_index': self.index,
+                '_id': f'book-{book_id}-page-{number}',
+                '_source': {'kind': 'page', 'book_id': book_id, 'page': number, 'content': text[start:end]},
+            }
+
+    async def _push(self, books: list[tuple[int, object]], with_pages: bool = True) -> int:
+        async def actions():
+            for book_id, book in books:
+                async for action in self._actions(book_id, book, with_pages):
+                    yield action
+
+        indexed, errors = await async_bulk(
+            self.client,
+            actions(),
+            chunk_size=settings.elastic.bulk_chunk_size,
+            raise_on_error=False
+        )
+        if errors:
+            logger.error(f'{len(errors)} search documents were rejected, first: {errors[0]}')
+        return indexed
+
+    async def index_book(self, book_id: int, book, with_pages: bool = True) -> None:
+        """Index a book after it was written; failures are logged, never raised."""
+        try:
+            await self.ensure_index()
+            if with_pages:
+                # Pages past the end of a shortened text must not linger
+                await self._delete_pages(book_id)
+            await self._push([(book_id, book)], with_pages)
+        except (ApiError, TransportError, OSError) as err:
+            logger.error(f'Search engine indexing failed for book {book_id}: {err}')
+
+    async def index_new_books(self, books: list[tuple[int, object]]) -> None:
+        """Index freshly inserted books in one bulk push; failures are logged, never raised.
+
+        New books have no stale pages, so unlike index_book nothing is deleted first.
+        """
+        if not books:
+            return
+        try:
+            await self.ensure_index()
+            await self._push(books)
+        except (ApiError, TransportError, OSError) as err:
+            logger.error(f'Search engine indexing failed for {len(books)} new books: {err}')
+
+    async def _delete_pages(self, book_id: int) -> None:
+        await self.client.delete_by_query(
+            index=self.index,
+            query={'bool': {'filter': [{'term': {'book_id': book_id}}, {'term': {'kind': 'page'}}]}},
+            ignore_unavailable=True
+        )
+
+    async def remove_book(self, book_id: int | None = None) -> None:
+        """Drop a book's documents, or every document when book_id is None."""
+        query = {'match_all': {}} if book_id is None else {'term': {'book_id': book_id}}
+        try:
+            await self.client.delete_by_query(index=self.index, query=query, ignore_unavailable=True)
+        except (ApiError, TransportError) as err:
+            logger.error(f'Search engine delete failed for book {book_id}: {err}')
+
+    async def reindex(
+            self,
+            session: AsyncSession,
+            batch_size: int = settings.elastic.reindex_batch,
+            max_in_flight: int = settings.elastic.max_in_flight
+            ) -> int:
+        """Push every book, resuming after the last checkpointed batch.
+
+        Up to max_in_flight batches are pushed concurrently. Batches are settled
+        oldest first, so the checkpoint only ever covers books that are indexed;
+        an interrupted run picks up from there. Returns the documents indexed.
+        """
+        await self.ensure_index()
+        after = int(await redis.get(REINDEX_CHECKPOINT_KEY) or 0)
+        logger.info(f'Reindexing books after id {after}')
+
+        pending: deque[tuple[int, asyncio.Task]] = deque()
+        indexed = 0
+        try:
+            while True:
+                result = await session.execute(
+                    select(BookModelOrm)
+                    .where(BookModelOrm.id > after)
+                    .order_by(BookModelOrm.id)
+                    .limit(batch_size)
+                )
+                books = result.scalars().all()
+                if not books:
+                    break
+
+                after = books[-1].id
+                pending.append((after, asyncio.create_task(self._push([(i.id, i) for i in books]))))
+                if len(pending) >= max_in_flight:
+                    indexed += await self._settle(pending)
+
+            while pending:
+                indexed += await self._settle(pending)
+        except BaseException:
+            for _, task in pending:
+                task.cancel()
+            raise
+
+        await redis.delete(REINDEX_CHECKPOINT_KEY)
+        return indexed
+
+    @staticmethod
+    async def _settle(pending: deque[tuple[int, asyncio.Task]]) -> int:
+        last_id, task = pending.popleft()
+        indexed = await task
+        await redis.set(REINDEX_CHECKPOINT_KEY, last_id)
+        return indexed
+
+    async def search(self, query: str, after: list | None = None, size: int = 20) -> list[dict]:
+        """Metadata and page documents matching query, best score first, with highlights.
+
+        Paged with search_after on (score, book id, page).
+        """
+        body = {
+            'query': {
+                'multi_match': {'query': query, 'fields': ['title^3', 'author^2', 'content']}
+            },
+            'highlight': {
+                'fields': {'title': {}, 'author': {}, 'content': {'fragment_size': 150, 'number_of_fragments': 3}}
+            },
+            'sort': [
+                '_score',
+                {'book_id': 'asc'},
+                {'page': {'order': 'asc', 'missing': '_first'}},
+            ],
+            'track_scores': True,
+            'size': size,
+        }
+        if after is not None:
+            body['search_after'] = after
+
+        response = await self.client.search(index=self.index, **body)
+        return [
+            {
+                'book_id': hit['_source']['book_id'],
+                'page': hit['_source'].get('page'),
+                'score': hit['_score'],
+                'highlight': hit.get('highlight', {}),
+                'sort': hit['sort'],
+            }
+            for hit in response['hits']['hits']
+        ]
+
+
+book_indexer = BookIndexer()
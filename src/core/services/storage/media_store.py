@@ -0,0 +1,96 @@
+from contextlib import suppress
+from typing import Iterator
+from uuid import uuid4
+import logging
+import time
+import re
+import os
+
+from src.core.config.config import media_root, settings
+
+
+logger = logging.getLogger(__name__)
+
+# Uploads are written here first, then moved into the content-addressed tree
+tmp_root = media_root / 'tmp'
+
+CONTENT_HASH_RE = re.compile(r'[0-9a-f]{64}')
+
+
+def is_content_hash(value:str) -> bool:
+    return CONTENT_HASH_RE.fullmatch(value) is not None
+
+def content_path(content_hash:str) -> str:
+    """Path of a stored text, sharded by the first two bytes of its SHA-256."""
+    if not is_content_hash(content_hash):
+        raise ValueError(f'Not a content hash: {content_hash!r}')
+    return os.path.join(media_root, content_hash[:2], content_hash[2:4], content_hash)
+
+def temp_path() -> str:
+    os.makedirs(tmp_root, exist_ok=True)
+    return os.path.join(tmp_root, uuid4().hex)
+
+def commit_file(temp:str, content_hash:str) -> str:
+    """Move a finished upload to its content address, reusing an identical stored file.
+
+    Either way the file's mtime is the time it was last claimed, which keeps
+    garbage collection off it until the claiming book row is committed.
+    """
+    path = content_path(content_hash)
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(temp, path)
+        return path
+
+    logger.debug(f'Reusing stored text {content_hash}')
+    os.remove(temp)
+    return path
+
+def _is_stale(path:str) -> bool:
+    return time.time() - os.stat(path).st_mtime >= settings.media_store.grace_period.total_seconds()
+
+def remove_file(content_hash:str) -> bool:
+    """Delete a stored text that is no longer referenced by any book.
+
+    A text claimed by an upload within the grace period is kept, since its
+    book row may not be committed yet; the sweeper collects it later if it
+    stays unreferenced. Returns whether the file was removed.
+    """
+    if not is_content_hash(content_hash):
+        logger.warning(f'Refusing to remove a text by invalid hash {content_hash!r}')
+        return False
+    path = content_path(content_hash)
+    try:
+        if not _is_stale(path):
+            logger.debug(f'Keeping recently claimed text {content_hash}')
+            return False
+        os.remove(path)
+    except FileNotFoundError:
+        return False
+    logger.debug(f'Removed unreferenced text {content_hash}')
+    return True
+
+def stale_contents() -> Iterator[str]:
+    """Hashes of stored texts last claimed before the grace period."""
+    for directory, _, files in os.walk(media_root):
+        for name in files:
+            path = os.path.join(directory, name)
+            # Only content-addressed files, never legacy uploads or temporary ones
+            if not is_content_hash(name) or path != content_path(name):
+                continue
+            with suppress(FileNotFoundError):
+                if _is_stale(path):
+                    yield name
+
+def remove_stale_temp_files() -> int:
+    """Delete uploads abandoned in the temporary directory by crashed workers."""
+    removed = 0
+    with suppress(FileNotFoundError):
+        for entry in os.scandir(tmp_root):
+            with suppress(FileNotFoundError):
+                if _is_stale(entry.path):
+                    os.remove(entry.path)
+                    removed += 1
+    return removed
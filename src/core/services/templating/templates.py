@@ -0,0 +1,30 @@
+from fastapi.templating import Jinja2Templates
+from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache
+import logging
+import os
+
+from src.core.config.config import frontend_root, template_cache_root, settings
+
+
+logger = logging.getLogger(__name__)
+
+os.makedirs(template_cache_root, exist_ok=True)
+
+# One environment for every page and email, compiled templates are kept
+# in memory and their bytecode on disk, shared by all workers
+template_env = Environment(
+    loader=FileSystemLoader(frontend_root),
+    autoescape=True,
+    bytecode_cache=FileSystemBytecodeCache(str(template_cache_root)),
+    auto_reload=settings.mode.mode == 'DEV'
+)
+templates = Jinja2Templates(env=template_env)
+
+
+def precompile_templates() -> int:
+    """Compile every template up front so first requests don't pay for it."""
+    names = template_env.list_templates()
+    for name in names:
+        template_env.get_template(name)
+    logger.debug(f'Precompiled {len(names)} templates')
+    return len(names)
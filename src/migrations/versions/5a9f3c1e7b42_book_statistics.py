@@ -0,0 +1,30 @@
+"""book statistics
+
+Revision ID: 5a9f3c1e7b42
+Revises: c27d5e9a4f18
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5a9f3c1e7b42'
+down_revision: Union[str, None] = 'c27d5e9a4f18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('books', sa.Column('word_count', sa.BigInteger(), nullable=True))
+    op.add_column('books', sa.Column('page_count', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('books', 'page_count')
+    op.drop_column('books', 'word_count')
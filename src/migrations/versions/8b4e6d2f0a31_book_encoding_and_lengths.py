@@ -0,0 +1,32 @@
+"""book encoding and lengths
+
+Revision ID: 8b4e6d2f0a31
+Revises: 3f1c2a9b7d10
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b4e6d2f0a31'
+down_revision: Union[str, None] = '3f1c2a9b7d10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('books', sa.Column('source_encoding', sa.String(), nullable=True))
+    op.add_column('books', sa.Column('byte_length', sa.BigInteger(), nullable=True))
+    op.add_column('books', sa.Column('char_length', sa.BigInteger(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('books', 'char_length')
+    op.drop_column('books', 'byte_length')
+    op.drop_column('books', 'source_encoding')
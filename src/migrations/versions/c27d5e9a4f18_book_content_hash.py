@@ -0,0 +1,30 @@
+"""book content hash
+
+Revision ID: c27d5e9a4f18
+Revises: 8b4e6d2f0a31
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c27d5e9a4f18'
+down_revision: Union[str, None] = '8b4e6d2f0a31'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('books', sa.Column('content_hash', sa.String(length=64), nullable=True))
+    op.create_index(op.f('ix_books_content_hash'), 'books', ['content_hash'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_books_content_hash'), table_name='books')
+    op.drop_column('books', 'content_hash')
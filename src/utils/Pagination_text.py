@@ -1,42 +1,93 @@
-from typing import List, Tuple
+from typing import Iterator, List, Tuple
+
+PARAGRAPH_BREAK = '\n\n'
+
+
+def iter_page_offsets(
+        text: str,
+        chars_per_page: int = 8000,
+        paragraphs: bool = False
+        ) -> Iterator[Tuple[int, int]]:
+    """Yield the (start, end) character offsets of every page of text, lazily.
+
+    A page ends at the last space or newline within chars_per_page characters
+    (the break itself belongs to neither page), or is cut at chars_per_page
+    when there is none. Breaks are found with str.rfind, so no page string is
+    copied and no character is visited by Python code.
 
-def split_text_into_pages(text: str, chars_per_page: int = 8000) -> Tuple[List[str], int]:
-    """Split text into pages of approximately chars_per_page characters without breaking words.
-    
     Args:
         text: The text to split
         chars_per_page: Target characters per page
-    
-    Returns:
-        Tuple of (pages, count) where:
-        - pages: List of text chunks
-        - count: Total number of pages
+        paragraphs: Prefer ending a page at a blank line found in the second
+            half of the page; the blank lines are skipped
+
+    Yields:
+        (start, end) pairs, text[start:end] being the page content
     """
-    pages = []
+    if chars_per_page < 1:
+        raise ValueError('chars_per_page must be positive')
+
     start = 0
     text_length = len(text)
-    
+    rfind = text.rfind
+
     while start < text_length:
-        # Calculate potential end position
-        end = min(start + chars_per_page, text_length)
-        
-        # If we're at the end of the text, add the remaining text
-        if end == text_length:
-            pages.append(text[start:end])
-            break
-            
-        # Find the last space or newline before the end position
-        last_break = end
-        while last_break > start and text[last_break] not in (' ', '\n'):
-            last_break -= 1
-            
-        # If we found a break character, use that position
+        end = start + chars_per_page
+
+        # The rest of the text fits on this page
+        if end >= text_length:
+            yield start, text_length
+            return
+
+        if paragraphs:
+            last_paragraph = rfind(PARAGRAPH_BREAK, start + chars_per_page // 2, end + 1)
+            # rfind finds the last pair of a longer run of blank lines, break before all of it
+            while last_paragraph - 1 > start and text[last_paragraph - 1] == '\n':
+                last_paragraph -= 1
+            if last_paragraph > start:
+                yield start, last_paragraph
+                start = last_paragraph
+                while start < text_length and text[start] == '\n':
+                    start += 1
+                continue
+
+        # Last space or newline in text[start + 1:end + 1]
+        last_break = max(rfind(' ', start + 1, end + 1), rfind('\n', start + 1, end + 1))
+
         if last_break > start:
-            pages.append(text[start:last_break])
+            yield start, last_break
             start = last_break + 1  # Skip the break character
         else:
             # No break found - force split at chars_per_page (unavoidable word break)
-            pages.append(text[start:end])
+            yield start, end
             start = end
-    
-    return pages, len(pages)
\ No newline at end of file
+
+
+def page_offsets(text: str, chars_per_page: int = 8000, paragraphs: bool = False) -> List[Tuple[int, int]]:
+    """Compute the (start, end) character offsets of every page of text.
+
+    Args:
+        text: The text to split
+        chars_per_page: Target characters per page
+        paragraphs: Prefer breaking pages at blank lines
+
+    Returns:
+        List of (start, end) pairs, text[start:end] being the page content
+    """
+    return list(iter_page_offsets(text, chars_per_page, paragraphs))
+
+def split_text_into_pages(text: str, chars_per_page: int = 8000, paragraphs: bool = False) -> Tuple[List[str], int]:
+    """Split text into pages of approximately chars_per_page characters without breaking words.
+
+    Args:
+        text: The text to split
+        chars_per_page: Target characters per page
+        paragraphs: Prefer breaking pages at blank lines
+
+    Returns:
+        Tuple of (pages, count) where:
+        - pages: List of text chunks
+        - count: Total number of pages
+    """
+    pages = [text[start:end] for start, end in iter_page_offsets(text, chars_per_page, paragraphs)]
+    return pages, len(pages)
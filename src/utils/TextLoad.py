@@ -1,30 +1,107 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+import asyncio
 import os
 from charset_normalizer import detect
 
+from src.core.config.config import settings
 from src.core.services.database.models.models import BookModelOrm
 
 
+# Bounded pool for blocking file reads and decoding, kept off the event loop
+text_executor = ThreadPoolExecutor(
+    max_workers=settings.text_load.max_workers,
+    thread_name_prefix='textload'
+)
+
+async def run_blocking(func:Callable[..., Any], *args) -> Any:
+    """Run a blocking text operation on the text-loading executor."""
+    return await asyncio.get_running_loop().run_in_executor(text_executor, func, *args)
+
+def detect_encoding(sample:bytes) -> str:
+    encoding = detect(sample)['encoding'] or 'utf-8'
+    # A plain ASCII prefix says nothing about the rest of the file
+    return 'utf-8' if encoding.lower() == 'ascii' else encoding
+
+
 class TextLoad:
       def __init__(self, data:BookModelOrm):
           self.data = data
 
+      def _adress(self, *path) -> str:
+        return os.path.join(os.getcwd(), *path, str(self.data.text_hook))
+
+      @property
+      def adress(self) -> str:
+        """Absolute path of the stored file."""
+        return self._adress()
+
+      @property
+      def normalized(self) -> bool:
+        """Whether the file was transcoded to UTF-8 with LF newlines at ingest."""
+        return getattr(self.data, 'source_encoding', None) is not None
+
+      def _read(self, *path) -> tuple[bytes, str]:
+        """Read the stored file once, detecting its charset from a prefix first.
+
+        A guess the whole file does not decode with is replaced by one
+        detected over the whole file.
+        """
+        with open(self._adress(*path), 'rb') as file:
+            raw = file.read()
+
+        if self.normalized:
+            return raw, 'utf-8'
+
+        encoding = detect_encoding(raw[:settings.text_load.detect_sample_bytes])
+        try:
+            raw.decode(encoding)
+        except UnicodeDecodeError:
+            encoding = detect_encoding(raw)
+        return raw, encoding
+
+      def detect_encoding(self, *path) -> str:
+        if self.normalized:
+            return 'utf-8'
+
+        with open(self._adress(*path), 'rb') as file:
+            sample = file.read(settings.text_load.detect_sample_bytes)
+
+        return detect_encoding(sample)
+
       def push_text(self, *path):
-        if path:
-            adress = os.path.join(os.getcwd(), *path,  str(self.data.text_hook))
-            text_view = 'No text'
-            encod = 'utf-8'
-        else:
-            adress = os.path.join(os.getcwd(),  str(self.data.text_hook))
-            text_view = 'No text'
-            encod = 'utf-8'
+        raw, encod = self._read(*path)
+        text_view = raw.decode(encod, errors='replace')
+
+        if self.normalized:
+            return text_view
+        return text_view.replace('\r\n', '\n').replace('\r', '\n')
+
+      def push_raw_text(self, *path) -> tuple[str, str]:
+        """Text exactly as stored (no newline translation) and its encoding.
+
+        Offsets computed over this text map one-to-one onto the file bytes;
+        undecodable bytes are kept as surrogates so that still holds.
+        """
+        raw, encod = self._read(*path)
+        return raw.decode(encod, errors='surrogateescape'), encod
+
+      def push_slice(self, start:int, end:int, encoding:str, *path) -> str:
+        """Read only the bytes [start, end) of the stored file."""
+        with open(self._adress(*path), 'rb') as file:
+            file.seek(start)
+            raw = file.read(end - start)
 
+        text_view = raw.decode(encoding, errors='replace')
+        if self.normalized:
+            return text_view
+        return text_view.replace('\r\n', '\n').replace('\r', '\n')
 
-        with open(adress, 'rb') as file:
-            detector = detect(file.read())
-            
-        encod = detector['encoding']
+      async def apush_text(self, *path) -> str:
+        return await run_blocking(self.push_text, *path)
 
-        with open(adress, encoding=encod) as file:
-            text_view = file.read()
+      async def apush_raw_text(self, *path) -> tuple[str, str]:
+        return await run_blocking(self.push_raw_text, *path)
 
-        return text_view
\ No newline at end of file
+      async def apush_slice(self, start:int, end:int, encoding:str, *path) -> str:
+        return await run_blocking(self.push_slice, start, end, encoding, *path)
@@ -1,15 +1,37 @@
 from fastapi import HTTPException
 from fastapi import UploadFile
 from sqlalchemy.ext.asyncio import AsyncSession
-from uuid import uuid4
+from contextlib import suppress
+from typing import NamedTuple
 import logging
+import hashlib
+import codecs
+import anyio
+import io
 import os
 
 from src.api.api_current.orm.db_orm import (output_data, select_data_book)
-from src.core.config.config import max_file_size, media_root
+from src.core.config.config import max_file_size, settings
+from src.core.services.storage.media_store import temp_path, commit_file
+from src.utils.TextLoad import detect_encoding, run_blocking
+from src.utils.Pagination_text import iter_page_offsets
 
 logger = logging.getLogger(__name__)
 
+upload_chunk_size = 64 * 1024
+
+
+class StoredText(NamedTuple):
+    """A book file written to media storage as UTF-8 text with LF newlines."""
+    path: str
+    source_encoding: str
+    byte_length: int
+    char_length: int
+    content_hash: str  # SHA-256 of the stored UTF-8 bytes
+    word_count: int
+    page_count: int
+
+
 class Choice:
     def __init__(self, choice:int, session:AsyncSession):
         self.choice = choice
@@ -25,8 +47,18 @@ class Select:
     def get_obj(self):
         return select_data_book(self.session, self.select_id)
     
-async def book_process(text_hook:UploadFile) -> str:
-    noise = uuid4().int
+async def book_process(text_hook:UploadFile, declared_encoding:str|None=None) -> StoredText:
+    """Stream an upload to disk as UTF-8, decoding it strictly.
+
+    The encoding is the one declared by the sender (declared_encoding, or the
+    charset of the upload's content type) or else detected from a prefix.
+    If the text does not decode strictly with it, the encoding is detected
+    again from the prefix and the chunk that failed, and cp1252 is the last
+    resort, so a late non-ASCII byte is never silently replaced.
+    The upload is read, transcoded, hashed and written in fixed-size chunks, and
+    is rejected once more than max_file_size bytes were read from it.
+    The file is stored under its SHA-256, so identical texts share one file.
+    """
 
     if ".." in text_hook.filename or "/" in text_hook.filename:
         raise HTTPException(status_code=400, detail="Invalid file name")
@@ -36,13 +68,103 @@ async def book_process(text_hook:UploadFile) -> str:
         if text_hook.size > max_file_size:
             raise HTTPException(status_code=400, detail="File size exceeds the limit")
 
-    os.makedirs(media_root, exist_ok=True)
-    local = os.path.join(media_root, f'{noise}')
+    sample = await text_hook.read(settings.text_load.detect_sample_bytes)
+    declared = _known_encoding(declared_encoding or _content_type_charset(text_hook))
+    source_encoding = declared or detect_encoding(sample)
+    try:
+        return await _store_text(text_hook, sample, source_encoding)
+    except UnicodeDecodeError as err:
+        logger.info(f'{text_hook.filename} is not {source_encoding} ({err}), detecting again')
+        failed_chunk = bytes(err.object)
+
+    # Detected over the prefix plus the chunk that failed, so the bytes that
+    # ruled out the first guess are seen while memory stays bounded
+    detected = await run_blocking(detect_encoding, sample + failed_chunk)
+    attempts = [('cp1252', 'replace')]
+    if detected != source_encoding:
+        attempts.insert(0, (detected, 'strict'))
+
+    for source_encoding, errors in attempts:
+        await text_hook.seek(0)
+        try:
+            return await _store_text(text_hook, b'', source_encoding, errors)
+        except UnicodeDecodeError as err:
+            logger.info(f'{text_hook.filename} is not {source_encoding} ({err})')
+
+
+def _content_type_charset(text_hook:UploadFile) -> str|None:
+    content_type = text_hook.headers.get('content-type', '') if text_hook.headers else ''
+    for parameter in content_type.split(';')[1:]:
+        name, _, value = parameter.partition('=')
+        if name.strip().lower() == 'charset':
+            return value.strip().strip('"') or None
+    return None
+
+def _known_encoding(encoding:str|None) -> str|None:
+    if not encoding:
+        return None
+    try:
+        return codecs.lookup(encoding).name
+    except LookupError:
+        logger.warning(f'Ignoring unknown declared encoding {encoding}')
+        return None
+
+async def _store_text(text_hook:UploadFile, chunk:bytes, source_encoding:str, errors:str='strict') -> StoredText:
+    """Transcode the rest of the upload, starting with chunk, into media storage."""
+    local = temp_path()
+    decoder = io.IncrementalNewlineDecoder(
+        codecs.getincrementaldecoder(source_encoding)(errors=errors),
+        translate=True
+        )
+    digest = hashlib.sha256()
+    received = byte_length = char_length = word_count = 0
+    in_word = False
+    first = True
+
+    try:
+        async with await anyio.open_file(local, 'wb') as filex:
+            while True:
+                if not chunk:
+                    chunk = await text_hook.read(upload_chunk_size)
+                received += len(chunk)
+                if received > max_file_size:
+                    raise HTTPException(status_code=400, detail="File size exceeds the limit")
+
+                final = not chunk
+                text = decoder.decode(chunk, final=final)
+                if first and text:
+                    text = text.removeprefix('\ufeff')
+                    first = False
+
+                data = text.encode('utf-8')
+                await filex.write(data)
+                digest.update(data)
+                byte_length += len(data)
+                char_length += len(text)
+
+                if text:
+                    # A word cut by the chunk boundary is counted once
+                    word_count += len(text.split()) - (in_word and not text[0].isspace())
+                    in_word = not text[-1].isspace()
+
+                if final:
+                    break
+                chunk = b''
+    except BaseException:
+        with suppress(FileNotFoundError):
+            os.remove(local)
+        raise
+
+    content_hash = digest.hexdigest()
+    path = commit_file(local, content_hash)
+    page_count = await run_blocking(count_pages, path)
+    return StoredText(path, source_encoding, byte_length, char_length, content_hash, word_count, page_count)
 
-    with open(local, 'wb') as filex:
-        filex.write(await text_hook.read())
 
-    return local
+def count_pages(path:str) -> int:
+    """Number of reader pages of a stored UTF-8 text."""
+    with open(path, encoding='utf-8', newline='') as file:
+        return sum(1 for _ in iter_page_offsets(file.read()))
 
 
 async def text_process_direct(content: str) -> str: